@@ -0,0 +1,164 @@
+"""Time and memory-profile every IntraBarZigzag stage over synthetic ticks.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py --sizes 1e4 1e5 1e6 --frequencies 1 5 60 --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json --tolerance 0.25
+
+Results are written as JSON, one record per (tick count, frequency), with the
+wall-clock time of each stage (best of ``--repeat`` runs) and its peak traced
+memory from a separate traced run. With ``--baseline`` the run is compared
+against an earlier results file and exits with status 1 if any stage got
+slower than the tolerance allows.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from intra_bar_zigzag import IntraBarZigzag  # noqa: E402
+from synthetic_ticks import synthetic_ticks  # noqa: E402
+
+STAGES = ('format', 'resample', 'exclude_weekends', 'detection')
+
+
+def run_case(tick_df: pd.DataFrame, resample_frequency: int, repeat: int = 1) -> dict:
+    """Best-of-``repeat`` stage timings, then one traced run for the peak memory of each stage."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        zigzag = IntraBarZigzag(tick_df, resample_frequency)
+        zigzag.runSetup()
+        zigzag.runDetection()
+        total = time.perf_counter() - start
+        if best is None or total < best['total_seconds']:
+            timings = zigzag.metrics['timings']
+            best = {
+                'total_seconds': total,
+                'ticks_per_second': len(tick_df) / total,
+                'stage_seconds': {stage: timings.get(stage) for stage in STAGES},
+                'n_bars': zigzag.metrics['n_bars'],
+                'n_bars_kept': len(zigzag.resampled_df),
+                'n_swings': zigzag.metrics['n_swings'],
+            }
+        del zigzag
+
+    # tracemalloc slows allocation down, so memory gets a run of its own
+    peaks = {}
+
+    def on_stage(stage, metrics):
+        peaks[stage] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+
+    tracemalloc.start()
+    zigzag = IntraBarZigzag(tick_df, resample_frequency, metrics_callback=on_stage)
+    tracemalloc.reset_peak()
+    zigzag.runSetup()
+    zigzag.runDetection()
+    tracemalloc.stop()
+    best['stage_peak_bytes'] = {stage: peaks.get(stage) for stage in STAGES}
+    return best
+
+
+def run_suite(sizes: list, frequencies: list, seed: int = 0, repeat: int = 1) -> dict:
+    results = []
+    for n_ticks in sizes:
+        tick_df = synthetic_ticks(n_ticks, seed=seed)
+        for resample_frequency in frequencies:
+            record = {'n_ticks': n_ticks, 'resample_frequency': resample_frequency}
+            record.update(run_case(tick_df, resample_frequency, repeat))
+            results.append(record)
+            print(f"{n_ticks:>12,} ticks {resample_frequency:>5}min  {record['total_seconds']:8.3f}s  "
+                  f"{record['ticks_per_second']:14,.0f} ticks/s", file=sys.stderr)
+        del tick_df
+    return {'environment': _environment(seed, repeat), 'results': results}
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_seconds: float = 0.05) -> list:
+    """Stages of ``current`` slower than ``baseline`` by more than ``tolerance`` (a fraction).
+
+    Stages that took under ``min_seconds`` in the baseline are too noisy to judge and are skipped.
+    """
+    reference = {(r['n_ticks'], r['resample_frequency']): r for r in baseline['results']}
+    regressions = []
+    for record in current['results']:
+        before = reference.get((record['n_ticks'], record['resample_frequency']))
+        if before is None:
+            continue
+        for stage in (*STAGES, 'total'):
+            if stage == 'total':
+                old, new = before['total_seconds'], record['total_seconds']
+            else:
+                old, new = before['stage_seconds'].get(stage), record['stage_seconds'].get(stage)
+            if old is not None and new is not None and old >= min_seconds and new > old * (1 + tolerance):
+                regressions.append({'n_ticks': record['n_ticks'], 'resample_frequency': record['resample_frequency'],
+                                    'stage': stage, 'baseline_seconds': old, 'seconds': new})
+    return regressions
+
+
+def _environment(seed: int, repeat: int) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'repeat': repeat,
+    }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e4, 1e5, 1e6],
+                        help='tick counts, e.g. 1e4 1e6 1e8 (1e8 needs roughly 20 GB of RAM)')
+    parser.add_argument('--frequencies', nargs='+', type=int, default=[1, 5, 15, 60],
+                        help='resample frequencies in minutes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='keep the fastest of this many runs')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='ignore baseline stages faster than this when checking for regressions')
+    args = parser.parse_args(argv)
+
+    report = run_suite([int(n) for n in args.sizes], args.frequencies, args.seed, args.repeat)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(report, json.load(f), args.tolerance, args.min_seconds)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    for regression in report.get('regressions', []):
+        print(f"regression: {regression['n_ticks']:,} ticks {regression['resample_frequency']}min "
+              f"{regression['stage']} {regression['baseline_seconds']:.3f}s -> {regression['seconds']:.3f}s",
+              file=sys.stderr)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Seeded synthetic tick data shaped like the ``data/`` exports.
+
+The generator reproduces what stresses the zigzag pipeline in real feeds:
+bursty tick density (a two-state quiet/busy intensity plus an intraday
+cycle), weekend gaps, millisecond timestamps with duplicates, prices on a
+0.001 grid so extremes tie, and quiet stretches that leave single-tick and
+empty bars.
+"""
+import numpy as np
+import pandas as pd
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86_400 * NS_PER_SECOND
+TICK_SIZE = 0.001
+
+
+def synthetic_ticks(n_ticks: int, seed: int = 0, start: str = '2024-01-01', start_price: float = 140.0,
+                    busy_rate: float = 2.0, quiet_rate: float = 0.02, switch_rate: float = 1 / 1800) -> pd.DataFrame:
+    """``n_ticks`` ticks with the columns of a ``Time (EET),Ask,Bid,AskVolume,BidVolume`` export.
+
+    Rates are ticks per second in the busy and quiet regimes; ``switch_rate``
+    is how often per second the regime flips. ``start`` should be a Monday:
+    trading runs Monday to Friday and Saturday/Sunday are left out.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Bursty arrivals: alternating busy/quiet regimes with an intraday cycle
+    busy = _regimes(rng, n_ticks, busy_rate / switch_rate, quiet_rate / switch_rate)
+    gaps = rng.exponential(1.0, n_ticks) / np.where(busy, busy_rate, quiet_rate)
+    trading_seconds = np.cumsum(gaps)
+    cycle = 1.0 + 0.5 * np.sin(2 * np.pi * trading_seconds / 86_400)
+    trading_ns = np.cumsum(gaps / cycle * NS_PER_SECOND).astype(np.int64)
+    # Millisecond stamps, so bursts produce duplicate timestamps
+    trading_ns -= trading_ns % 1_000_000
+
+    # Five trading days per calendar week
+    week = trading_ns // (5 * NS_PER_DAY)
+    times = pd.Timestamp(start).value + week * 7 * NS_PER_DAY + trading_ns % (5 * NS_PER_DAY)
+
+    # Random walk on the tick grid; unchanged prices make ties at the extremes
+    steps = rng.choice(np.array([-2, -1, 0, 0, 1, 2]), size=n_ticks)
+    bid = np.round(start_price + np.cumsum(steps) * TICK_SIZE, 3)
+    spread = rng.integers(2, 60, size=n_ticks) * TICK_SIZE
+    volumes = rng.choice(np.array([0.1, 0.5, 0.9, 1.2, 1.35, 2.25]), size=(2, n_ticks))
+
+    return pd.DataFrame({
+        'Time (EET)': times.view('datetime64[ns]'),
+        'Ask': np.round(bid + spread, 3),
+        'Bid': bid,
+        'AskVolume': volumes[0],
+        'BidVolume': volumes[1],
+    })
+
+
+def _regimes(rng: np.random.Generator, n_ticks: int, busy_ticks: float, quiet_ticks: float) -> np.ndarray:
+    """Busy flag of every tick; regime lengths in ticks are geometric with the given means."""
+    lengths = []
+    total = 0
+    while total < n_ticks:
+        n_pairs = max(1, int((n_ticks - total) / (busy_ticks + quiet_ticks)) + 1)
+        pairs = np.stack((rng.geometric(1 / busy_ticks, n_pairs), rng.geometric(1 / quiet_ticks, n_pairs)), axis=1)
+        lengths.append(pairs.ravel())
+        total += int(pairs.sum())
+    lengths = np.concatenate(lengths)
+    return np.repeat(np.arange(len(lengths)) % 2 == 0, lengths)[:n_ticks]
@@ -0,0 +1,283 @@
+"""Segmented NumPy aggregation of ticks into bars.
+
+Times are int64 epoch nanoseconds and prices float64. Bars are described by
+the tick position where each one starts; a bar ends where the next one starts.
+"""
+import numpy as np
+
+from range_extremes import RangeExtremeIndex
+
+NS_PER_MINUTE = 60_000_000_000
+NS_PER_DAY = 1440 * NS_PER_MINUTE
+NAT = np.iinfo(np.int64).min  # int64 view of NaT
+
+# Column layout of the resampled dataframe
+PRICE_TIME_COLUMNS = (
+    ('open_price', 'open_time'),
+    ('high_price', 'high_time'),
+    ('low_price', 'low_time'),
+    ('close_price', 'close_time'),
+    # For LH Formations
+    ('high_between_open_low_price', 'high_between_open_low_time'),
+    ('low_between_high_close_price', 'low_between_high_close_time'),
+    # For HL Formations
+    ('low_between_open_high_price', 'low_between_open_high_time'),
+    ('high_between_low_close_price', 'high_between_low_close_time'),
+)
+BAR_COLUMNS = (
+    'open_price', 'high_price', 'low_price', 'close_price',
+    'open_time', 'high_time', 'low_time', 'close_time',
+    'candle_type',
+    'high_between_open_low_price', 'high_between_open_low_time',
+    'low_between_high_close_price', 'low_between_high_close_time',
+    'low_between_open_high_price', 'low_between_open_high_time',
+    'high_between_low_close_price', 'high_between_low_close_time',
+)
+# Optional per-bar features and the columns each one adds
+BAR_FEATURES = {
+    'tick_count': ('tick_count',),
+    'spread': ('spread',),
+    'volume': ('volume',),
+    'realized_variance': ('realized_variance',),
+    'range_timing': ('high_delay', 'low_delay'),
+}
+
+
+def bars_frame(labels: np.ndarray, bars: dict):
+    """Bar columns laid out as ``resampled_df``: a ``time`` index, categorical ``candle_type`` and features last.
+
+    pandas is only imported here, so the array pipelines don't load it.
+    """
+    import pandas as pd
+
+    # candle_classification imports this module
+    from candle_classification import CANDLE_TYPES
+
+    columns = {}
+    for col in BAR_COLUMNS:
+        values = bars[col]
+        if col == 'candle_type':
+            values = pd.Categorical.from_codes(values, categories=CANDLE_TYPES)
+        elif col.endswith('_time'):
+            values = values.view('datetime64[ns]')
+        columns[col] = values
+    for col in (col for feature_cols in BAR_FEATURES.values() for col in feature_cols if col in bars):
+        values = bars[col]
+        columns[col] = values.view('timedelta64[ns]') if col.endswith('_delay') else values
+    index = pd.DatetimeIndex(labels.view('datetime64[ns]'), name='time')
+    return pd.DataFrame(columns, index=index)
+
+
+def to_ns(time) -> int:
+    """Epoch nanoseconds of an int, ISO string, ``np.datetime64``, ``datetime`` or ``pd.Timestamp``, without pandas."""
+    if isinstance(time, (int, np.integer)):
+        return int(time)
+    value = getattr(time, 'value', None)  # pd.Timestamp
+    if value is not None:
+        return int(value)
+    return int(np.datetime64(time, 'ns').astype(np.int64))
+
+
+def time_bar_edges(times: np.ndarray, resample_frequency: int, origin: int = None) -> tuple[np.ndarray, np.ndarray]:
+    """Bin labels and first tick position of every time bar, empty bins included.
+
+    Bins follow ``DataFrame.resample(f'{resample_frequency}min')``: they are
+    anchored at midnight of the first tick's day, or at ``origin`` (int64 ns)
+    when a slice of ticks has to share the bins of the whole series.
+    """
+    freq_ns = int(resample_frequency * NS_PER_MINUTE)
+    if len(times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if origin is None:
+        origin = times[0] - times[0] % NS_PER_DAY
+    first_bin = (times[0] - origin) // freq_ns
+    last_bin = (times[-1] - origin) // freq_ns
+    labels = origin + np.arange(first_bin, last_bin + 1, dtype=np.int64) * freq_ns
+    starts = np.searchsorted(times, labels, side='left')
+    return labels, starts
+
+
+def sparse_time_bar_edges(times: np.ndarray, resample_frequency: int,
+                          origin: int = None) -> tuple[np.ndarray, np.ndarray, dict]:
+    """``time_bar_edges`` of the non-empty bins only, plus the runs of empty bins between them.
+
+    The gap table holds the int64 ns label of the first (``start``) and last
+    (``end``) empty bin of every run and its ``length`` in bins, so memory
+    follows the tick count rather than the calendar span.
+    """
+    freq_ns = int(resample_frequency * NS_PER_MINUTE)
+    empty = np.empty(0, dtype=np.int64)
+    if len(times) == 0:
+        return empty, empty, {'start': empty, 'end': empty, 'length': empty}
+    if origin is None:
+        origin = times[0] - times[0] % NS_PER_DAY
+    bins = (times - origin) // freq_ns
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bins)) + 1))
+    bar_bins = bins[starts]
+    labels = origin + bar_bins * freq_ns
+
+    skipped = np.diff(bar_bins) - 1
+    at = np.flatnonzero(skipped)
+    gaps = {'start': labels[at] + freq_ns, 'end': labels[at + 1] - freq_ns, 'length': skipped[at]}
+    return labels, starts, gaps
+
+
+def coarsen_time_bar_edges(labels: np.ndarray, starts: np.ndarray, resample_frequency: int,
+                           coarser_frequency: int) -> tuple[np.ndarray, np.ndarray]:
+    """``time_bar_edges`` of a coarser frame from a finer one over the same ticks.
+
+    ``coarser_frequency`` must be a multiple of ``resample_frequency``; each
+    coarse bar is then the union of the fine bars inside it.
+    """
+    if coarser_frequency % resample_frequency:
+        raise ValueError(f'{coarser_frequency} is not a multiple of {resample_frequency}')
+    if len(labels) == 0:
+        return labels, starts
+    fine_ns = int(resample_frequency * NS_PER_MINUTE)
+    coarse_ns = int(coarser_frequency * NS_PER_MINUTE)
+    origin = labels[0] - labels[0] % NS_PER_DAY
+    first_bin = (labels[0] - origin) // coarse_ns
+    last_bin = (labels[-1] - origin) // coarse_ns
+    coarse_labels = origin + np.arange(first_bin, last_bin + 1, dtype=np.int64) * coarse_ns
+    # The first coarse bin can open before the first fine bin
+    fine_bins = np.maximum((coarse_labels - labels[0]) // fine_ns, 0)
+    return coarse_labels, starts[fine_bins]
+
+
+def aggregate_bars(times: np.ndarray, prices: np.ndarray, starts: np.ndarray,
+                   index: RangeExtremeIndex = None) -> dict:
+    """OHLC prices and times plus the four between pivots of every bar.
+
+    ``times`` must be sorted. Empty bars get NaN prices and NaT times. Ties
+    resolve to the first tick, like ``idxmax``/``idxmin``, and the between
+    windows span whole timestamps, like ``df.loc[open_time:low_time]``.
+    Extremes come from ``index``, which is built over ``prices`` if not given.
+    """
+    n_ticks = len(times)
+    n_bars = len(starts)
+    ends = np.append(starts[1:], n_ticks)
+    filled = ends > starts
+
+    bars = {}
+    for price_col, time_col in PRICE_TIME_COLUMNS:
+        bars[price_col] = np.full(n_bars, np.nan)
+        bars[time_col] = np.full(n_bars, NAT, dtype=np.int64)
+    if n_ticks == 0 or not filled.any():
+        return bars
+
+    seg_starts = starts[filled]
+    seg_ends = ends[filled]
+    own_index = index is None
+    if own_index:
+        # A throwaway index only ever holds one kind of table, see below
+        index = RangeExtremeIndex(prices)
+        high_pos = first_extreme(prices, seg_starts, seg_ends, 'max')
+        low_pos = first_extreme(prices, seg_starts, seg_ends, 'min')
+    else:
+        high_pos = index.argmax(seg_starts, seg_ends)
+        low_pos = index.argmin(seg_starts, seg_ends)
+
+    # Label slicing includes every tick sharing the boundary timestamp
+    high_first = np.searchsorted(times, times[high_pos], side='left')
+    high_stop = np.searchsorted(times, times[high_pos], side='right')
+    low_first = np.searchsorted(times, times[low_pos], side='left')
+    low_stop = np.searchsorted(times, times[low_pos], side='right')
+
+    hbol_pos = index.argmax(seg_starts, low_stop)
+    hblc_pos = index.argmax(low_first, seg_ends)
+    if own_index:
+        index.release('max')
+    lbhc_pos = index.argmin(high_first, seg_ends)
+    lboh_pos = index.argmin(seg_starts, high_stop)
+    close_pos = seg_ends - 1
+
+    for (price_col, time_col), pos in zip(
+            PRICE_TIME_COLUMNS,
+            (seg_starts, high_pos, low_pos, close_pos, hbol_pos, lbhc_pos, lboh_pos, hblc_pos)):
+        bars[price_col][filled] = prices[pos]
+        bars[time_col][filled] = times[pos]
+    return bars
+
+
+def bar_features(times: np.ndarray, prices: np.ndarray, starts: np.ndarray, features, bars: dict = None,
+                 asks: np.ndarray = None, bids: np.ndarray = None, volumes: np.ndarray = None,
+                 bar_ends: np.ndarray = None) -> dict:
+    """Columns of the ``BAR_FEATURES`` named in ``features``, over the same bars as ``aggregate_bars``.
+
+    - ``tick_count``: ticks in the bar.
+    - ``spread``: ``asks - bids`` (``bids`` defaults to ``prices``) weighted
+      by how long each tick stood: until the next tick, and for a bar's last
+      tick until ``bar_ends`` (int64 ns) when given.
+    - ``volume``: sum of ``volumes``.
+    - ``realized_variance``: sum of squared tick-to-tick log returns.
+    - ``range_timing``: ``high_delay``/``low_delay``, int64 ns from the open
+      to the high/low of ``bars``.
+
+    Empty bars get 0 ticks and volume, NaN spread and variance and NaT delays.
+    """
+    unknown = set(features) - set(BAR_FEATURES)
+    if unknown:
+        raise ValueError(f'unknown bar features {sorted(unknown)}')
+    n_ticks = len(times)
+    ends = np.append(starts[1:], n_ticks)
+    filled = ends > starts
+    columns = {}
+
+    if 'tick_count' in features:
+        columns['tick_count'] = ends - starts
+    if 'spread' in features:
+        if asks is None:
+            raise ValueError('the spread feature needs Ask prices')
+        # Each tick's spread stands until the next tick, or until the end of its bar when that is known
+        held = np.diff(times, append=times[-1:]).astype(np.float64) if n_ticks else np.empty(0)
+        if bar_ends is not None and filled.any():
+            last = ends[filled] - 1
+            held[last] = bar_ends[filled] - times[last]
+        spread = np.asarray(asks, dtype=np.float64) - np.asarray(prices if bids is None else bids, dtype=np.float64)
+        weight = _segment_sums(held, starts, ends, filled)
+        weighted = _segment_sums(spread * held, starts, ends, filled)
+        # Bars whose ticks all share one timestamp fall back to the plain mean
+        plain = _segment_sums(spread, starts, ends, filled) / np.maximum(ends - starts, 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns['spread'] = np.where(weight > 0, weighted / weight, plain)
+        columns['spread'][~filled] = np.nan
+    if 'volume' in features:
+        if volumes is None:
+            raise ValueError('the volume feature needs AskVolume and BidVolume')
+        columns['volume'] = _segment_sums(np.asarray(volumes, dtype=np.float64), starts, ends, filled)
+    if 'realized_variance' in features:
+        squared = np.zeros(n_ticks)
+        if n_ticks > 1:
+            squared[1:] = np.diff(np.log(np.asarray(prices, dtype=np.float64))) ** 2
+        # The first tick of a bar has no return inside the bar
+        squared[starts[filled]] = 0.0
+        columns['realized_variance'] = _segment_sums(squared, starts, ends, filled)
+        columns['realized_variance'][~filled] = np.nan
+    if 'range_timing' in features:
+        for name, time_col in (('high_delay', 'high_time'), ('low_delay', 'low_time')):
+            delay = np.full(len(starts), NAT, dtype=np.int64)
+            delay[filled] = bars[time_col][filled] - bars['open_time'][filled]
+            columns[name] = delay
+    return columns
+
+
+def _segment_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, filled: np.ndarray) -> np.ndarray:
+    sums = np.zeros(len(starts))
+    if filled.any():
+        first = starts[filled][0]
+        sums[filled] = np.add.reduceat(values[first:ends[filled][-1]], starts[filled] - first)
+    return sums
+
+
+def first_extreme(prices: np.ndarray, seg_starts: np.ndarray, seg_ends: np.ndarray, kind: str) -> np.ndarray:
+    """Position of the first max (``kind='max'``) or min (``'min'``) of every segment, without an index.
+
+    Segments are ``[seg_starts[i], seg_ends[i])`` of ``prices``; they must be
+    non-empty and contiguous, each one ending where the next starts.
+    """
+    reduce = np.maximum if kind == 'max' else np.minimum
+    first, last = seg_starts[0], seg_ends[-1]
+    window = prices[first:last]
+    extreme = reduce.reduceat(window, seg_starts - first)
+    hits = np.flatnonzero(window == np.repeat(extreme, seg_ends - seg_starts))
+    return first + hits[np.searchsorted(hits, seg_starts - first)]
@@ -0,0 +1,213 @@
+"""Persistent cache of resampled bars and swings.
+
+Entries are content-addressed: the key hashes the tick times and prices, any
+other tick column the sampler or bar features read, the bar settings,
+``ALGORITHM_VERSION`` and the candle_properties and connection_rules tables,
+so any change to the inputs misses. Every column is
+stored as its own ``.npy`` file and loaded memory-mapped on a hit. The cache
+is bounded by size and evicts the least recently used entries.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from bar_aggregation import NS_PER_MINUTE
+from bar_samplers import TimeBarSampler
+from swing_detection import SwingDetector
+
+# Bump whenever aggregation, classification or detection output changes
+ALGORITHM_VERSION = 2
+
+
+class BarCache:
+    def __init__(self, cache_dir: str, max_bytes: int = 2 << 30) -> None:
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def run(self, zigzag) -> bool:
+        """``runSetup`` and ``runDetection`` on an IntraBarZigzag, or load their result.
+
+        Returns True on a cache hit. Hits leave ``resampled_df`` backed by
+        read-only memory-mapped columns.
+        """
+        zigzag.format_dataframe()
+        key = self.key(zigzag)
+        with zigzag._stage('cache_load'):
+            hit = self._load(key, zigzag)
+        zigzag.metrics['cache'] = 'hit' if hit else 'miss'
+        if hit:
+            return True
+        zigzag.runSetup()
+        zigzag.runDetection()
+        self._store(key, zigzag)
+        return False
+
+    def key(self, zigzag) -> str:
+        """Content hash of a formatted IntraBarZigzag's ticks and settings."""
+        digest = hashlib.blake2b(digest_size=20)
+        times, prices = zigzag._tick_arrays()
+        digest.update(np.ascontiguousarray(times).data)
+        digest.update(np.ascontiguousarray(prices).data)
+        # Tick columns read by event samplers and by bar features
+        columns = []
+        if not isinstance(zigzag.bar_sampler, TimeBarSampler) or 'volume' in zigzag.features:
+            columns.append(zigzag._tick_volumes())
+        if 'spread' in zigzag.features:
+            columns.append(zigzag._tick_column('Ask'))
+        if zigzag.compact and zigzag.features:
+            # Compact prices are rounded, features use the exact Bid
+            columns.append(zigzag._tick_column('Bid'))
+        for values in columns:
+            if values is not None:
+                digest.update(np.ascontiguousarray(values).data)
+        settings = {
+            'version': ALGORITHM_VERSION,
+            'bar_sampler': repr(zigzag.bar_sampler),
+            'sparse': zigzag.sparse,
+            'compact': zigzag.compact,
+            'price_scale': zigzag.price_scale,
+            'features': zigzag.features,
+            'candle_properties': zigzag.candle_properties,
+            'connection_rules': sorted(map(list, zigzag.connection_rules.items())),
+        }
+        digest.update(json.dumps(settings, sort_keys=True, default=list).encode())
+        return digest.hexdigest()
+
+    def invalidate(self, key: str) -> None:
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def clear(self) -> None:
+        for key in self.keys():
+            self.invalidate(key)
+
+    def keys(self) -> list:
+        """Cached keys, least recently used first."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not name.startswith('.') and os.path.isdir(path):
+                entries.append((os.stat(path).st_mtime_ns, name))
+        return [name for _, name in sorted(entries)]
+
+    def size(self) -> int:
+        return sum(_dir_bytes(os.path.join(self.cache_dir, key)) for key in self.keys())
+
+    def _load(self, key: str, zigzag) -> bool:
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            resampled_df = _load_frame(path, 'bars', meta['bars'])
+            gaps = _load_frame(path, 'gaps', meta['gaps']) if meta['gaps'] else None
+            swings = [np.load(os.path.join(path, f'swing_{field}.npy'))
+                      for field in ('time', 'price', 'type', 'bar', 'source')]
+        except (OSError, ValueError, KeyError):
+            return False
+        # The directory's mtime is the entry's last use
+        os.utime(path)
+        zigzag.resampled_df = resampled_df
+        zigzag.gaps = gaps
+        zigzag.weekends_excluded_flag = True
+        zigzag._set_swings(*swings)
+        _record_metrics(zigzag)
+        return True
+
+    def _store(self, key: str, zigzag) -> None:
+        # Write next to the target and swap in, so readers never see a partial entry
+        try:
+            tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp-')
+        except OSError:
+            return
+        try:
+            meta = {
+                'created': time.time(),
+                'bars': _save_frame(tmp_dir, 'bars', zigzag.resampled_df),
+                'gaps': _save_frame(tmp_dir, 'gaps', zigzag.gaps) if zigzag.gaps is not None else None,
+            }
+            for field, values in (('time', zigzag.swing_times), ('price', zigzag.swing_prices),
+                                  ('type', zigzag.swing_types), ('bar', zigzag.swing_bars),
+                                  ('source', zigzag.swing_sources)):
+                np.save(os.path.join(tmp_dir, f'swing_{field}.npy'), np.ascontiguousarray(values))
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+            path = os.path.join(self.cache_dir, key)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_dir, path)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        keys = self.keys()
+        sizes = {key: _dir_bytes(os.path.join(self.cache_dir, key)) for key in keys}
+        total = sum(sizes.values())
+        # Always keep the newest entry, even if it alone is over the limit
+        for key in keys[:-1]:
+            if total <= self.max_bytes:
+                break
+            self.invalidate(key)
+            total -= sizes[key]
+
+
+def _record_metrics(zigzag) -> None:
+    """Bar and swing counts of a loaded entry, as ``runSetup`` and ``runDetection`` record them."""
+    codes = zigzag.resampled_df['candle_type'].cat.codes.to_numpy()
+    if zigzag.sparse:
+        removed = int(zigzag.gaps.loc[zigzag.gaps['weekend'], 'length'].sum())
+        n_blank = int(zigzag.gaps['length'].sum())
+    elif zigzag.resample_frequency is not None and len(codes):
+        # Weekends are the only bins missing between the first and the last bar
+        labels = zigzag.resampled_df.index.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        n_bins = (labels[-1] - labels[0]) // int(zigzag.resample_frequency * NS_PER_MINUTE) + 1
+        removed = n_blank = int(n_bins - len(labels))
+    else:
+        removed = n_blank = 0
+    zigzag._record_bars(len(zigzag._tick_arrays()[0]), codes, n_blank)
+    zigzag.metrics['bars_removed'] = removed
+    zigzag._record_detection(codes, SwingDetector(zigzag.candle_properties, zigzag.connection_rules))
+
+
+def _save_frame(path: str, name: str, df: pd.DataFrame) -> dict:
+    """Write the index and every column of ``df`` as ``.npy``; returns how to read them back."""
+    specs = []
+    for i, (col, values) in enumerate([(None, df.index.to_series()), *df.items()]):
+        spec = {'name': col, 'file': f'{name}_{i}.npy'}
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            spec['categories'] = values.cat.categories.tolist()
+            data = values.cat.codes.to_numpy()
+        elif np.issubdtype(values.dtype, np.datetime64):
+            spec['datetime'] = True
+            data = values.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        else:
+            data = values.to_numpy()
+        np.save(os.path.join(path, spec['file']), data)
+        specs.append(spec)
+    return {'index_name': df.index.name, 'index': specs[0], 'columns': specs[1:]}
+
+
+def _load_frame(path: str, name: str, meta: dict) -> pd.DataFrame:
+    def load(spec):
+        values = np.load(os.path.join(path, spec['file']), mmap_mode='r')
+        if 'categories' in spec:
+            return pd.Categorical.from_codes(values, categories=spec['categories'])
+        if spec.get('datetime'):
+            return values.view('datetime64[ns]')
+        return values
+
+    index = pd.Index(load(meta['index']), name=meta['index_name'])
+    return pd.DataFrame({spec['name']: load(spec) for spec in meta['columns']}, index=index, copy=False)
+
+
+def _dir_bytes(path: str) -> int:
+    try:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    except OSError:
+        return 0
@@ -0,0 +1,83 @@
+"""Bar samplers: where each bar starts in the tick array.
+
+Every sampler returns ``(labels, starts)``: the int64 ns label of each bar and
+the position of its first tick, ready for ``aggregate_bars``. Time bars keep
+empty bins as blank bars; event bars are never empty and are labelled with
+their first tick's time.
+"""
+import numpy as np
+
+from bar_aggregation import time_bar_edges
+
+
+class TimeBarSampler:
+    """Fixed-duration bars, binned like ``resample(f'{resample_frequency}min')``."""
+    def __init__(self, resample_frequency: int) -> None:
+        self.resample_frequency = resample_frequency
+
+    def edges(self, times: np.ndarray, prices: np.ndarray, volumes: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        return time_bar_edges(times, self.resample_frequency)
+
+    def __repr__(self) -> str:
+        return f'TimeBarSampler({self.resample_frequency})'
+
+
+class TickBarSampler:
+    """Bars of ``ticks_per_bar`` ticks; the last bar may be shorter."""
+    def __init__(self, ticks_per_bar: int) -> None:
+        if ticks_per_bar < 1:
+            raise ValueError('ticks_per_bar must be at least 1')
+        self.ticks_per_bar = int(ticks_per_bar)
+
+    def edges(self, times: np.ndarray, prices: np.ndarray, volumes: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        starts = np.arange(0, len(times), self.ticks_per_bar, dtype=np.int64)
+        return times[starts], starts
+
+    def __repr__(self) -> str:
+        return f'TickBarSampler({self.ticks_per_bar})'
+
+
+class VolumeBarSampler:
+    """Bars that close on the tick where cumulative volume crosses a multiple of ``volume_per_bar``."""
+    def __init__(self, volume_per_bar: float) -> None:
+        if volume_per_bar <= 0:
+            raise ValueError('volume_per_bar must be positive')
+        self.volume_per_bar = volume_per_bar
+
+    def edges(self, times: np.ndarray, prices: np.ndarray, volumes: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        if volumes is None:
+            raise ValueError(f'{self!r} needs tick volumes')
+        starts = _threshold_starts(np.cumsum(volumes, dtype=np.float64), self.volume_per_bar)
+        return times[starts], starts
+
+    def __repr__(self) -> str:
+        return f'VolumeBarSampler({self.volume_per_bar})'
+
+
+class DollarBarSampler:
+    """Bars that close when cumulative notional (price * volume) crosses a multiple of ``notional_per_bar``."""
+    def __init__(self, notional_per_bar: float) -> None:
+        if notional_per_bar <= 0:
+            raise ValueError('notional_per_bar must be positive')
+        self.notional_per_bar = notional_per_bar
+
+    def edges(self, times: np.ndarray, prices: np.ndarray, volumes: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        if volumes is None:
+            raise ValueError(f'{self!r} needs tick volumes')
+        starts = _threshold_starts(np.cumsum(prices * volumes, dtype=np.float64), self.notional_per_bar)
+        return times[starts], starts
+
+    def __repr__(self) -> str:
+        return f'DollarBarSampler({self.notional_per_bar})'
+
+
+def _threshold_starts(cumulative: np.ndarray, threshold: float) -> np.ndarray:
+    """Bar starts for bars closing on the first tick at or past each multiple of ``threshold``."""
+    n_ticks = len(cumulative)
+    if n_ticks == 0:
+        return np.empty(0, dtype=np.int64)
+    crossings = np.arange(1, int(cumulative[-1] // threshold) + 1) * threshold
+    closes = np.searchsorted(cumulative, crossings, side='left')
+    # A single large tick can cross several multiples at once
+    starts = np.unique(np.concatenate(([0], closes + 1)))
+    return starts[starts < n_ticks].astype(np.int64)
@@ -0,0 +1,215 @@
+"""Table-driven candle classification for whole bar arrays.
+
+Every bar is reduced to a small integer key built from comparison bits
+(body direction, high/low ordering, wicks and the two between-pivot flags of
+its formation). The key indexes a lookup table of candle type codes that is
+generated once from the classification rules below.
+"""
+import numpy as np
+
+from bar_aggregation import NAT
+
+# Candle type codes, index into this tuple
+CANDLE_TYPES = (
+    'blank',
+    # Bullish LH
+    'Bullish_LH_FullWick',
+    'Bullish_LH_FullWick_OpenUpDownToLow_PostHighDipBelowClose',
+    'Bullish_LH_FullWick_OpenUpDownToLow',
+    'Bullish_LH_FullWick_PostHighDipBelowClose',
+    'Bullish_LH_TopWick',
+    'Bullish_LH_TopWick_PostHighDipBelowClose',
+    'Bullish_LH_BottomWick',
+    'Bullish_LH_BottomWick_OpenUpDownToLow',
+    'Bullish_LH_NoWick',
+    # Bullish HL
+    'Bullish_HL_FullWick',
+    'Bullish_HL_FullWick_OpenDownThenUpToHigh_PostLowRallyAboveClose',
+    'Bullish_HL_FullWick_OpenDownThenUpToHigh',
+    'Bullish_HL_FullWick_PostLowRallyAboveClose',
+    'Bullish_HL_BottomWick',
+    'Bullish_HL_BottomWick_OpenDownThenUpToHigh',
+    # Bearish HL
+    'Bearish_HL_FullWick',
+    'Bearish_HL_FullWick_OpenDownThenUpToHigh_PostLowRallyAboveClose',
+    'Bearish_HL_FullWick_OpenDownThenUpToHigh',
+    'Bearish_HL_FullWick_PostLowRallyAboveClose',
+    'Bearish_HL_BottomWick',
+    'Bearish_HL_BottomWick_PostLowRallyAboveClose',
+    'Bearish_HL_TopWick',
+    'Bearish_HL_TopWick_OpenDownThenUpToHigh',
+    'Bearish_HL_NoWick',
+    # Bearish LH
+    'Bearish_LH_FullWick',
+    'Bearish_LH_FullWick_OpenUpDownToLow_PostHighDipBelowClose',
+    'Bearish_LH_FullWick_OpenUpDownToLow',
+    'Bearish_LH_FullWick_PostHighDipBelowClose',
+    'Bearish_LH_TopWick',
+    'Bearish_LH_TopWick_OpenUpDownToLow',
+    # Doji LH
+    'Doji_LH_FullWick',
+    'Doji_LH_FullWick_OpenUpDownToLow_PostHighDipBelowClose',
+    'Doji_LH_FullWick_OpenUpDownToLow',
+    'Doji_LH_FullWick_PostHighDipBelowClose',
+    'Doji_LH_TopWick',
+    # Doji HL
+    'Doji_HL_FullWick',
+    'Doji_HL_FullWick_OpenDownThenUpToHigh_PostLowRallyAboveClose',
+    'Doji_HL_FullWick_OpenDownThenUpToHigh',
+    'Doji_HL_FullWick_PostLowRallyAboveClose',
+    'Doji_HL_BottomWick',
+    # Single Event
+    'Single_Event',
+    # Unknown
+    '__bullish_LH_UNKNOWN',
+    '__bullish_HL_UNKNOWN',
+    '__bullish_UNKNOWN',
+    '__bearish_HL_UNKNOWN',
+    '__bearish_LH_UNKNOWN',
+    '__bearish_UNKNOWN',
+    'doji_HL_UNKNOWN',
+    'doji_LH_UNKNOWN',
+)
+CANDLE_TYPE_CODES = {name: code for code, name in enumerate(CANDLE_TYPES)}
+BLANK = CANDLE_TYPE_CODES['blank']
+
+# Body direction
+BULLISH, BEARISH, DOJI = 0, 1, 2
+# Ordering of the high and low inside the bar
+LH, HL, SAME_TIME = 0, 1, 2
+# Which between pivots a candle type keeps
+NO_FORMATION, LH_FORMATION, HL_FORMATION = 0, 1, 2
+
+# Initial candle types that are refined by their between pivots, and which of
+# the two flags each of them looks at. The others keep their initial type.
+REFINEMENTS = {
+    # LH Formations (Bullish & Bearish & Doji)
+    'Bullish_LH_FullWick': (True, True),
+    'Bullish_LH_TopWick': (False, True),
+    'Bullish_LH_BottomWick': (True, False),
+    'Bearish_LH_FullWick': (True, True),
+    'Bearish_LH_TopWick': (True, False),
+    'Doji_LH_FullWick': (True, True),
+    # HL Formations (Bearish & Bullish & Doji)
+    'Bearish_HL_FullWick': (True, True),
+    'Bearish_HL_BottomWick': (False, True),
+    'Bearish_HL_TopWick': (True, False),
+    'Bullish_HL_FullWick': (True, True),
+    'Bullish_HL_BottomWick': (True, False),
+    'Doji_HL_FullWick': (True, True),
+}
+
+
+def _classify_key(body: int, order: int, top_wick: bool, bottom_wick: bool, flag1: bool, flag2: bool) -> tuple[str, int]:
+    """Candle type and formation of one comparison key.
+
+    For LH bars ``flag1``/``flag2`` are "high between open and low above open"
+    and "low between high and close below close"; for HL bars they are "low
+    between open and high below open" and "high between low and close above
+    close".
+    """
+    if order == SAME_TIME:
+        if body == DOJI:
+            return 'Single_Event', NO_FORMATION
+        return ('__bullish_UNKNOWN' if body == BULLISH else '__bearish_UNKNOWN'), NO_FORMATION
+
+    direction = ('Bullish', 'Bearish', 'Doji')[body]
+    if order == LH:
+        allowed = {
+            BULLISH: ('FullWick', 'TopWick', 'BottomWick', 'NoWick'),
+            BEARISH: ('FullWick', 'TopWick'),
+            DOJI: ('FullWick', 'TopWick'),
+        }[body]
+    else:
+        allowed = {
+            BULLISH: ('FullWick', 'BottomWick'),
+            BEARISH: ('FullWick', 'BottomWick', 'TopWick', 'NoWick'),
+            DOJI: ('FullWick', 'BottomWick'),
+        }[body]
+    wick = {(True, True): 'FullWick', (True, False): 'TopWick',
+            (False, True): 'BottomWick', (False, False): 'NoWick'}[(top_wick, bottom_wick)]
+    formation = ('LH', 'HL')[order]
+    if wick not in allowed:
+        prefix = {BULLISH: '__bullish', BEARISH: '__bearish', DOJI: 'doji'}[body]
+        return f'{prefix}_{formation}_UNKNOWN', NO_FORMATION
+
+    candle_type = f'{direction}_{formation}_{wick}'
+    if candle_type not in REFINEMENTS:
+        return candle_type, NO_FORMATION
+
+    if order == LH:
+        suffix1, suffix2 = '_OpenUpDownToLow', '_PostHighDipBelowClose'
+    else:
+        suffix1, suffix2 = '_OpenDownThenUpToHigh', '_PostLowRallyAboveClose'
+    uses_flag1, uses_flag2 = REFINEMENTS[candle_type]
+    if uses_flag1 and flag1:
+        candle_type += suffix1
+    if uses_flag2 and flag2:
+        candle_type += suffix2
+    return candle_type, (LH_FORMATION, HL_FORMATION)[order]
+
+
+def _build_lookup() -> tuple[np.ndarray, np.ndarray]:
+    codes = np.empty(144, dtype=np.int8)
+    formations = np.zeros(len(CANDLE_TYPES), dtype=np.int8)
+    for key in range(144):
+        flag2, rest = key % 2, key // 2
+        flag1, rest = rest % 2, rest // 2
+        bottom_wick, rest = rest % 2, rest // 2
+        top_wick, rest = rest % 2, rest // 2
+        order, body = rest % 3, rest // 3
+        candle_type, formation = _classify_key(body, order, bool(top_wick), bool(bottom_wick), bool(flag1), bool(flag2))
+        codes[key] = CANDLE_TYPE_CODES[candle_type]
+        formations[codes[key]] = formation
+    return codes, formations
+
+
+CANDLE_LOOKUP, CANDLE_FORMATION = _build_lookup()
+
+
+def classify_candles(open_price, high_price, low_price, close_price,
+                     high_time, low_time,
+                     high_between_open_low_price, low_between_high_close_price,
+                     low_between_open_high_price, high_between_low_close_price) -> np.ndarray:
+    """Candle type code of every bar; bars with a NaN open are ``blank``."""
+    body = np.where(close_price > open_price, BULLISH, np.where(close_price < open_price, BEARISH, DOJI))
+    order = np.where(low_time < high_time, LH, np.where(high_time < low_time, HL, SAME_TIME))
+    top_wick = high_price > np.maximum(open_price, close_price)
+    bottom_wick = low_price < np.minimum(open_price, close_price)
+    is_lh = order == LH
+    flag1 = np.where(is_lh, high_between_open_low_price > open_price, low_between_open_high_price < open_price)
+    flag2 = np.where(is_lh, low_between_high_close_price < close_price, high_between_low_close_price > close_price)
+
+    key = body * 3 + order
+    for bit in (top_wick, bottom_wick, flag1, flag2):
+        key = key * 2 + bit
+    codes = CANDLE_LOOKUP[key]
+    codes[np.isnan(open_price)] = BLANK
+    return codes
+
+
+def classify_bars(bars: dict) -> np.ndarray:
+    """``classify_candles`` over a bar column dict from ``aggregate_bars``."""
+    return classify_candles(
+        bars['open_price'], bars['high_price'], bars['low_price'], bars['close_price'],
+        bars['high_time'], bars['low_time'],
+        bars['high_between_open_low_price'], bars['low_between_high_close_price'],
+        bars['low_between_open_high_price'], bars['high_between_low_close_price'],
+    )
+
+
+def formation_masks(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Bars that keep their LH between pivots and bars that keep their HL ones."""
+    formation = CANDLE_FORMATION[codes]
+    return formation == LH_FORMATION, formation == HL_FORMATION
+
+
+def mask_between_pivots(bars: dict, codes: np.ndarray) -> None:
+    """Blank out, in place, the between pivots that don't belong to each bar's formation."""
+    is_lh, is_hl = formation_masks(codes)
+    for col in ('high_between_open_low', 'low_between_high_close'):
+        bars[col + '_price'][~is_lh] = np.nan
+        bars[col + '_time'][~is_lh] = NAT
+    for col in ('low_between_open_high', 'high_between_low_close'):
+        bars[col + '_price'][~is_hl] = np.nan
+        bars[col + '_time'][~is_hl] = NAT
@@ -0,0 +1,195 @@
+"""Decimation of tick series for charting.
+
+``decimate`` cuts a tick series down to a point budget, either with the
+min and max of every time bucket or with largest-triangle-three-buckets
+(LTTB), and always keeps the given anchor ticks. ``anchor_indices`` finds
+the exact ticks behind an IntraBarZigzag's swings (and, optionally, bar
+highs/lows). ``DecimationPyramid`` precomputes successively coarser min/max
+levels so a zoomed window is re-decimated from the finest level that is still
+cheap, thinning the anchors when a window holds more than the budget allows,
+and ``zigzag_figure`` wires it to a plotly FigureWidget.
+"""
+import numpy as np
+
+from bar_aggregation import first_extreme
+
+
+def decimate(times: np.ndarray, prices: np.ndarray, n_points: int, keep: np.ndarray = None,
+             method: str = 'minmax') -> np.ndarray:
+    """Sorted indices of at most ``n_points`` ticks plus the ``keep`` indices.
+
+    ``method`` is ``'minmax'`` (first min and max of each of ``n_points // 2``
+    equal time buckets) or ``'lttb'``. The first and last ticks are always kept.
+    """
+    n_ticks = len(times)
+    if n_ticks <= n_points:
+        selected = np.arange(n_ticks)
+    elif method == 'minmax':
+        selected = _minmax(times, prices, max(1, n_points // 2))
+    elif method == 'lttb':
+        selected = _lttb(times, prices, max(3, n_points))
+    else:
+        raise ValueError(f'unknown decimation method {method!r}')
+    if keep is not None and len(keep):
+        selected = np.union1d(selected, keep)
+    return selected
+
+
+def tick_indices(times: np.ndarray, prices: np.ndarray, at_times: np.ndarray, at_prices: np.ndarray) -> np.ndarray:
+    """Index of the tick at each ``(at_times, at_prices)`` point.
+
+    Among ticks sharing the timestamp the one with the closest price wins;
+    points whose timestamp has no tick are dropped.
+    """
+    at_times = np.asarray(at_times, dtype=np.int64)
+    at_prices = np.asarray(at_prices, dtype=np.float64)
+    lo = np.searchsorted(times, at_times, side='left')
+    hi = np.searchsorted(times, at_times, side='right')
+    found = hi > lo
+    indices = lo[found]
+    # Duplicate timestamps are rare, so they are resolved one by one
+    for i in np.flatnonzero(hi[found] - lo[found] > 1):
+        first, last = lo[found][i], hi[found][i]
+        indices[i] = first + np.argmin(np.abs(prices[first:last] - at_prices[found][i]))
+    return np.unique(indices)
+
+
+def anchor_indices(zigzag, times: np.ndarray, prices: np.ndarray, bar_extremes: bool = False) -> np.ndarray:
+    """Ticks that must survive decimation: the zigzag's swings, plus every bar's high and low with ``bar_extremes``."""
+    anchors = [tick_indices(times, prices, zigzag.swing_times, zigzag.swing_prices)]
+    bars = zigzag.resampled_df
+    if bar_extremes and bars is not None:
+        for price_col, time_col in (('high_price', 'high_time'), ('low_price', 'low_time')):
+            bar_times = bars[time_col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            valid = ~np.isnat(bar_times.view('datetime64[ns]'))
+            anchors.append(tick_indices(times, prices, bar_times[valid],
+                                        bars[price_col].to_numpy(dtype=np.float64)[valid]))
+    return np.unique(np.concatenate(anchors))
+
+
+class DecimationPyramid:
+    def __init__(self, times: np.ndarray, prices: np.ndarray, keep: np.ndarray = None, factor: int = 4,
+                 min_points: int = 1024) -> None:
+        """Min/max levels of ``(times, prices)``, each about ``factor`` times smaller than the last.
+
+        Level 0 is the ticks themselves; levels stop once under ``min_points``.
+        Every level contains the ``keep`` indices.
+        """
+        self.times = np.asarray(times)
+        self.prices = np.asarray(prices)
+        self.keep = np.empty(0, dtype=np.int64) if keep is None else np.unique(keep)
+        self.factor = factor
+        # Tick indices and times of every level
+        self.levels = [np.arange(len(self.times))]
+        self.level_times = [self.times]
+        while len(self.levels[-1]) > min_points:
+            previous = self.levels[-1]
+            # Buckets of 2 * factor consecutive points keep their min and max
+            starts = np.arange(0, len(previous), 2 * factor)
+            ends = np.append(starts[1:], len(previous))
+            level_prices = self.prices[previous]
+            picks = np.concatenate((first_extreme(level_prices, starts, ends, 'max'),
+                                    first_extreme(level_prices, starts, ends, 'min'),
+                                    [0, len(previous) - 1]))
+            level = np.union1d(previous[picks], self.keep)
+            if len(level) >= len(previous):
+                break
+            self.levels.append(level)
+            self.level_times.append(self.times[level])
+
+    def query(self, start=None, end=None, n_points: int = 4000, method: str = 'minmax') -> np.ndarray:
+        """Sorted tick indices for the ``[start, end)`` window (epoch ns) at about ``n_points``.
+
+        The window is cut from the coarsest level that still has ``n_points``
+        points in it and decimated from there. ``keep`` ticks in the window are
+        always included while they fit in half the budget; beyond that only the
+        first min and max of ``n_points // 4`` equal time buckets of them are.
+        """
+        level = 0
+        lo = hi = None
+        for i in range(len(self.levels) - 1, -1, -1):
+            level_times = self.level_times[i]
+            lo = 0 if start is None else np.searchsorted(level_times, start, side='left')
+            hi = len(level_times) if end is None else np.searchsorted(level_times, end, side='left')
+            if hi - lo >= n_points:
+                level = i
+                break
+            level = i
+        indices = self.levels[level][lo:max(lo, hi)]
+        if len(indices) == 0:
+            return indices
+        keep_lo, keep_hi = np.searchsorted(self.keep, (indices[0], indices[-1] + 1))
+        keep = self.keep[keep_lo:keep_hi]
+        if len(keep) > n_points // 2:
+            keep = keep[_minmax(self.times[keep], self.prices[keep], max(1, n_points // 4))]
+        selected = decimate(self.times[indices], self.prices[indices], max(3, n_points - len(keep)),
+                            np.searchsorted(indices, keep), method)
+        return indices[selected]
+
+
+def zigzag_figure(zigzag, times: np.ndarray, prices: np.ndarray, n_points: int = 4000, method: str = 'minmax',
+                  bar_extremes: bool = False):
+    """plotly FigureWidget of the decimated ticks and the zigzag's swings, re-decimated on zoom.
+
+    ``bar_extremes`` also anchors every bar's high and low tick. Needs plotly
+    (and ipywidgets for the zoom callback) at call time only.
+    """
+    import plotly.graph_objects as go
+
+    times = np.asarray(times, dtype='datetime64[ns]').view(np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    pyramid = DecimationPyramid(times, prices, keep=anchor_indices(zigzag, times, prices, bar_extremes))
+    shown = pyramid.query(n_points=n_points, method=method)
+
+    fig = go.FigureWidget()
+    fig.add_trace(go.Scattergl(x=times[shown].view('datetime64[ns]'), y=prices[shown], mode='lines',
+                               name='Tick Price', line=dict(color='darkblue', width=1)))
+    swings = zigzag.swings.to_pandas()
+    for swing_type, name, color, symbol in (('high', 'Swing Highs', 'red', 'arrow-down'),
+                                            ('low', 'Swing Lows', 'green', 'arrow-up')):
+        typed = swings[swings['type'] == swing_type]
+        fig.add_trace(go.Scattergl(x=typed['time'], y=typed['price'], mode='markers', name=name,
+                                   marker=dict(color=color, size=10, symbol=symbol)))
+
+    def on_zoom(layout, x_range):
+        if x_range is None:
+            shown = pyramid.query(n_points=n_points, method=method)
+        else:
+            start, end = (np.datetime64(str(bound).replace(' ', 'T'), 'ns').astype(np.int64) for bound in x_range)
+            shown = pyramid.query(start, end + 1, n_points, method)
+        with fig.batch_update():
+            fig.data[0].x = times[shown].view('datetime64[ns]')
+            fig.data[0].y = prices[shown]
+
+    fig.layout.xaxis.on_change(on_zoom, 'range')
+    return fig
+
+
+def _minmax(times: np.ndarray, prices: np.ndarray, n_buckets: int) -> np.ndarray:
+    edges = np.linspace(times[0], times[-1], n_buckets + 1)[1:-1]
+    starts = np.unique(np.concatenate(([0], np.searchsorted(times, edges, side='left'))))
+    starts = starts[starts < len(times)]
+    ends = np.append(starts[1:], len(times))
+    picks = np.concatenate((first_extreme(prices, starts, ends, 'max'), first_extreme(prices, starts, ends, 'min'),
+                            [0, len(times) - 1]))
+    return np.unique(picks)
+
+
+def _lttb(times: np.ndarray, prices: np.ndarray, n_points: int) -> np.ndarray:
+    """Largest-triangle-three-buckets over equal-count buckets of the inner ticks."""
+    x = (times - times[0]).astype(np.float64)
+    y = prices.astype(np.float64)
+    bounds = np.linspace(1, len(times) - 1, n_points - 1).astype(np.int64)
+    selected = np.empty(n_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, len(times) - 1
+    previous = 0
+    for b in range(n_points - 2):
+        first, last = bounds[b], bounds[b + 1]
+        # Average of the next bucket (the last tick for the final bucket)
+        next_first, next_last = (bounds[b + 1], bounds[b + 2]) if b + 2 < len(bounds) else (len(times) - 1, len(times))
+        avg_x, avg_y = x[next_first:next_last].mean(), y[next_first:next_last].mean()
+        area = np.abs((x[previous] - avg_x) * (y[first:last] - y[previous])
+                      - (x[previous] - x[first:last]) * (avg_y - y[previous]))
+        previous = first + int(np.argmax(area))
+        selected[b + 1] = previous
+    return selected
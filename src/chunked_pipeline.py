@@ -0,0 +1,119 @@
+"""Out-of-core intra-bar zigzag over tick files larger than memory.
+
+``run_chunked`` feeds fixed-size chunks of ticks to an
+``IncrementalIntraBarZigzag``, which carries the open bar and the detector's
+candle1 from one chunk to the next, and appends the bars and swings every
+chunk closes to raw little-endian column files in an output directory. Only
+one chunk and the bars it closes are held at a time, so peak memory depends
+on ``chunk_size`` and not on the file. The output is exactly what an
+in-memory ``IntraBarZigzag`` gives: its ``resampled_df`` without the
+``nat_group`` column, and its swings. ``read_bars`` and ``read_swings``
+memory-map it back.
+"""
+import json
+import os
+
+import numpy as np
+
+from bar_aggregation import BAR_COLUMNS, bars_frame
+from incremental import IncrementalIntraBarZigzag
+from swing_series import SwingSeries
+from tick_loader import TIME_COLUMN, iter_tick_csv
+from tick_store import _atomic_save
+from zigzag_core import tick_arrays
+
+# On-disk dtype of every bar and swing column; ``time`` is the bar label
+BAR_DTYPES = {'time': '<i8', **{col: '|i1' if col == 'candle_type' else '<i8' if col.endswith('_time') else '<f8'
+                                for col in BAR_COLUMNS}}
+SWING_DTYPES = {'time': '<i8', 'price': '<f8', 'type': '|i1'}
+
+
+def run_chunked(source, resample_frequency: int, output_dir: str, chunk_size: int = 1_000_000,
+                candle_properties: dict = None, connection_rules: dict = None) -> dict:
+    """Set up and detect ``source`` chunk by chunk, writing bars and swings to ``output_dir``.
+
+    ``source`` is a CSV export path, ``load_tick_arrays``-style arrays (e.g.
+    memory-mapped from a ``TickStore`` or the loader's cache) or an iterable
+    of such chunks. Ticks must be in time order across chunks. Returns the
+    metadata saved as ``meta.json``, which is rewritten after every chunk.
+    """
+    zigzag = IncrementalIntraBarZigzag(resample_frequency, candle_properties, connection_rules, swing_tail=0)
+    meta = {'resample_frequency': resample_frequency, 'n_ticks': 0, 'n_chunks': 0, 'n_bars': 0, 'n_swings': 0,
+            'complete': False}
+    for name in ('bars', 'swings'):
+        os.makedirs(os.path.join(output_dir, name), exist_ok=True)
+    files = {}
+    try:
+        for name, dtypes in (('bars', BAR_DTYPES), ('swings', SWING_DTYPES)):
+            for col in dtypes:
+                files[name, col] = open(os.path.join(output_dir, name, col + '.bin'), 'wb')
+
+        for chunk in _chunks(source, chunk_size):
+            times, prices = tick_arrays(chunk)
+            _write(files, meta, *zigzag.append_arrays(times, prices))
+            meta['n_ticks'] += len(times)
+            meta['n_chunks'] += 1
+            _save_meta(output_dir, meta)
+
+        # The last bar closes with the file
+        _write(files, meta, *zigzag.pending_arrays())
+        meta['complete'] = True
+        _save_meta(output_dir, meta)
+    finally:
+        for f in files.values():
+            f.close()
+    return meta
+
+
+def read_meta(output_dir: str) -> dict:
+    with open(os.path.join(output_dir, 'meta.json')) as f:
+        return json.load(f)
+
+
+def read_bars(output_dir: str) -> tuple[np.ndarray, dict]:
+    """Memory-mapped bar labels (int64 ns) and columns (``candle_type`` as codes) of a chunked run."""
+    columns = _read_columns(output_dir, 'bars', BAR_DTYPES, read_meta(output_dir)['n_bars'])
+    return columns.pop('time'), columns
+
+
+def read_bars_frame(output_dir: str):
+    """``read_bars`` laid out like ``resampled_df``."""
+    return bars_frame(*read_bars(output_dir))
+
+
+def read_swings(output_dir: str) -> SwingSeries:
+    """Memory-mapped swings of a chunked run."""
+    columns = _read_columns(output_dir, 'swings', SWING_DTYPES, read_meta(output_dir)['n_swings'])
+    return SwingSeries(columns['time'], columns['price'], columns['type'])
+
+
+def _chunks(source, chunk_size: int):
+    if isinstance(source, (str, os.PathLike)):
+        yield from iter_tick_csv(source, chunk_size, columns=('Bid',))
+    elif isinstance(source, dict):
+        for start in range(0, len(source[TIME_COLUMN]), chunk_size):
+            yield {col: source[col][start:start + chunk_size] for col in (TIME_COLUMN, 'Bid')}
+    else:
+        yield from source
+
+
+def _write(files: dict, meta: dict, labels: np.ndarray, bars: dict, swings: tuple) -> None:
+    columns = {('bars', 'time'): labels, **{('bars', col): bars[col] for col in BAR_COLUMNS}}
+    columns.update({('swings', col): values for col, values in zip(SWING_DTYPES, swings)})
+    for (name, col), values in columns.items():
+        dtype = (BAR_DTYPES if name == 'bars' else SWING_DTYPES)[col]
+        np.asarray(values, dtype=dtype).tofile(files[name, col])
+        files[name, col].flush()
+    meta['n_bars'] += len(labels)
+    meta['n_swings'] += len(swings[0])
+
+
+def _save_meta(output_dir: str, meta: dict) -> None:
+    _atomic_save(os.path.join(output_dir, 'meta.json'), lambda f: f.write(json.dumps(meta).encode()))
+
+
+def _read_columns(output_dir: str, name: str, dtypes: dict, length: int) -> dict:
+    if length == 0:
+        return {col: np.empty(0, dtype=dtype) for col, dtype in dtypes.items()}
+    return {col: np.memmap(os.path.join(output_dir, name, col + '.bin'), mode='r', dtype=dtype, shape=(length,))
+            for col, dtype in dtypes.items()}
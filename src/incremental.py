@@ -0,0 +1,230 @@
+"""Incremental intra-bar zigzag over a growing tick history.
+
+``append`` processes only the new ticks: the open bar is finished tick by
+tick, the bars after it are aggregated in one vectorised pass, and the last
+bar is kept open for the next append. Blank runs longer than a day are
+dropped at the seam like ``_exclude_weekends`` does, and detection resumes
+from the checkpointed candle1. Concatenating the appended bars and swings,
+plus ``pending()``, gives exactly what a full recompute over all ticks gives.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from bar_aggregation import (NAT, NS_PER_DAY, NS_PER_MINUTE, PRICE_TIME_COLUMNS, aggregate_bars, bars_frame,
+                             time_bar_edges)
+from candle_classification import classify_bars, mask_between_pivots
+from streaming import RunningBar
+from swing_detection import SWING_TYPES, SwingDetector
+from zigzag_core import tick_arrays
+
+CHECKPOINT_VERSION = 1
+
+
+class IncrementalIntraBarZigzag:
+    def __init__(self, resample_frequency: int, candle_properties: dict = None, connection_rules: dict = None,
+                 swing_tail: int = 64) -> None:
+        self.resample_frequency = resample_frequency
+        self.freq_ns = int(resample_frequency * NS_PER_MINUTE)
+        self.candle_properties = candle_properties
+        self.connection_rules = connection_rules
+        self.detector = SwingDetector(candle_properties, connection_rules)
+
+        # Bins are anchored at midnight of the first tick's day, like resample()
+        self.origin = None
+        self.bar_id = None
+        self.bar = None
+        self.last_time = NAT
+        # Most recent swings, kept in the checkpoint
+        self.swing_tail = swing_tail
+        self.tail_times = np.empty(0, dtype=np.int64)
+        self.tail_prices = np.empty(0)
+        self.tail_types = np.empty(0, dtype=np.int8)
+
+    def append(self, ticks) -> tuple:
+        """Add ticks that follow the ones seen so far.
+
+        ``ticks`` is a tick export dataframe (``Time (EET)``, ``Bid``), a
+        formatted one (time index, ``price``) or a ``(times, prices)`` pair.
+        Returns the bars closed by these ticks, laid out like
+        ``resampled_df``, and the swings they confirmed.
+        """
+        times, prices = tick_arrays(*ticks) if isinstance(ticks, tuple) else tick_arrays(ticks)
+        return self._frames(*self.append_arrays(times, prices))
+
+    def append_arrays(self, times: np.ndarray, prices: np.ndarray) -> tuple[np.ndarray, dict, tuple]:
+        """``append`` on sorted int64 ns ``times`` and float64 ``prices``, without pandas.
+
+        Returns the closed bars' labels, their columns (``candle_type`` as
+        codes) and the ``(times, prices, types)`` of the confirmed swings.
+        """
+        if len(times) == 0:
+            return _no_bars()
+        if times[0] < self.last_time:
+            raise ValueError('appended ticks must not be older than the last tick seen')
+        self.last_time = times[-1]
+        if self.origin is None:
+            self.origin = times[0] - times[0] % NS_PER_DAY
+        bins = (times - self.origin) // self.freq_ns
+
+        # Finish the open bar
+        split = 0
+        if self.bar is not None:
+            split = np.searchsorted(bins, self.bar_id, side='right')
+            for time, price in zip(times[:split].tolist(), prices[:split].tolist()):
+                self.bar.update(time, price)
+        if split == len(times):
+            return _no_bars()
+
+        # Every bar after it but the last is complete
+        times, prices, bins = times[split:], prices[split:], bins[split:]
+        labels, starts = time_bar_edges(times, self.resample_frequency, self.origin)
+        closed = aggregate_bars(times[:starts[-1]], prices[:starts[-1]], starts[:-1])
+
+        pieces = []
+        if self.bar is not None:
+            # Blank bins between the old open bar and the new ticks
+            n_blank = bins[0] - self.bar_id - 1
+            pieces.append((np.array([self.origin + self.bar_id * self.freq_ns]), self.bar.to_bar()))
+            pieces.append((self.origin + (self.bar_id + 1 + np.arange(n_blank)) * self.freq_ns, _empty_bars(n_blank)))
+        pieces.append((labels[:-1], closed))
+        new_labels = np.concatenate([piece_labels for piece_labels, _ in pieces]).astype(np.int64)
+        new_bars = {col: np.concatenate([bars[col] for _, bars in pieces]) for col in closed}
+
+        # The last bar stays open
+        self.bar_id = int(bins[-1])
+        self.bar = RunningBar(int(times[starts[-1]]), float(prices[starts[-1]]))
+        for time, price in zip(times[starts[-1] + 1:].tolist(), prices[starts[-1] + 1:].tolist()):
+            self.bar.update(time, price)
+
+        return self._close_bars(new_labels, new_bars)
+
+    def pending(self) -> tuple:
+        """The open bar and the swings it would add if the ticks ended now; state is left untouched."""
+        return self._frames(*self.pending_arrays())
+
+    def pending_arrays(self) -> tuple[np.ndarray, dict, tuple]:
+        """``pending`` as ``append_arrays`` returns it."""
+        if self.bar is None:
+            return _no_bars()
+        state = self.detector.get_state()
+        tail = self.tail_times, self.tail_prices, self.tail_types
+        try:
+            return self._close_bars(np.array([self.origin + self.bar_id * self.freq_ns]), self.bar.to_bar())
+        finally:
+            self.detector.set_state(state)
+            self.tail_times, self.tail_prices, self.tail_types = tail
+
+    def checkpoint(self) -> dict:
+        """Everything ``append`` needs to carry on, as a JSON-serialisable dict."""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'resample_frequency': self.resample_frequency,
+            'origin': None if self.origin is None else int(self.origin),
+            'last_time': int(self.last_time),
+            'bar_id': self.bar_id,
+            'bar': None if self.bar is None else self.bar.get_state(),
+            'candle1': list(self.detector.get_state()),
+            'swing_tail': {
+                'time': self.tail_times.tolist(),
+                'price': self.tail_prices.tolist(),
+                'type': self.tail_types.tolist(),
+            },
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: dict, candle_properties: dict = None, connection_rules: dict = None,
+                        swing_tail: int = 64) -> 'IncrementalIntraBarZigzag':
+        """Resume from ``checkpoint``; pass the same candle_properties and connection_rules it was made with."""
+        if checkpoint['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version {checkpoint['version']}")
+        zigzag = cls(checkpoint['resample_frequency'], candle_properties, connection_rules, swing_tail)
+        zigzag.origin = checkpoint['origin']
+        zigzag.last_time = checkpoint['last_time']
+        zigzag.bar_id = checkpoint['bar_id']
+        if checkpoint['bar'] is not None:
+            zigzag.bar = RunningBar.from_state(checkpoint['bar'])
+        zigzag.detector.set_state(tuple(checkpoint['candle1']))
+        tail = checkpoint['swing_tail']
+        zigzag.tail_times = np.array(tail['time'], dtype=np.int64)
+        zigzag.tail_prices = np.array(tail['price'], dtype=np.float64)
+        zigzag.tail_types = np.array(tail['type'], dtype=np.int8)
+        return zigzag
+
+    def save_checkpoint(self, path: str) -> None:
+        # Write next to the target and swap in, so a crash never leaves a partial checkpoint
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.checkpoint(), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load_checkpoint(cls, path: str, candle_properties: dict = None, connection_rules: dict = None,
+                        swing_tail: int = 64) -> 'IncrementalIntraBarZigzag':
+        with open(path) as f:
+            return cls.from_checkpoint(json.load(f), candle_properties, connection_rules, swing_tail)
+
+    def _close_bars(self, labels: np.ndarray, bars: dict) -> tuple[np.ndarray, dict, tuple]:
+        codes = classify_bars(bars)
+        mask_between_pivots(bars, codes)
+        bars['candle_type'] = codes
+
+        # Blank runs longer than a day are weekends; a run always ends inside one append
+        keep = _outside_long_runs(np.isnan(bars['open_price']), 1440 / self.resample_frequency)
+        labels = labels[keep]
+        bars = {col: values[keep] for col, values in bars.items()}
+
+        swings = self.detector.run(bars['candle_type'], bars)
+        self.tail_times, self.tail_prices, self.tail_types = (
+            np.concatenate((tail, new))[-self.swing_tail:] if self.swing_tail else tail[:0]
+            for tail, new in zip((self.tail_times, self.tail_prices, self.tail_types), swings))
+        return labels, bars, swings
+
+    @staticmethod
+    def _frames(labels: np.ndarray, bars: dict, swings: tuple) -> tuple:
+        return bars_frame(labels, bars), _swings_frame(*swings)
+
+
+def _empty_bars(n_bars: int) -> dict:
+    bars = {}
+    for price_col, time_col in PRICE_TIME_COLUMNS:
+        bars[price_col] = np.full(n_bars, np.nan)
+        bars[time_col] = np.full(n_bars, NAT, dtype=np.int64)
+    return bars
+
+
+def _outside_long_runs(empty: np.ndarray, max_run: float) -> np.ndarray:
+    """False on runs of ``empty`` longer than ``max_run``, True elsewhere."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], empty, [False])).astype(np.int8)))
+    run_starts, run_ends = edges[::2], edges[1::2]
+    keep = np.ones(len(empty), dtype=bool)
+    for start, end in zip(run_starts, run_ends):
+        if end - start > max_run:
+            keep[start:end] = False
+    return keep
+
+
+def _no_bars() -> tuple[np.ndarray, dict, tuple]:
+    bars = _empty_bars(0)
+    bars['candle_type'] = np.empty(0, dtype=np.int8)
+    return np.empty(0, dtype=np.int64), bars, _no_swings()
+
+
+def _no_swings() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int8)
+
+
+def _swings_frame(times: np.ndarray, prices: np.ndarray, types: np.ndarray):
+    import pandas as pd
+
+    return pd.DataFrame({
+        'time': times.view('datetime64[ns]'),
+        'price': prices,
+        'type': np.array(SWING_TYPES, dtype=object)[types],
+    })
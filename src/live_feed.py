@@ -0,0 +1,226 @@
+"""Asyncio live feed for the streaming intra-bar zigzag.
+
+Sources push ticks into a ``LiveIntraBarZigzag`` through a bounded queue:
+``replay_csv`` streams a tick export at real or accelerated speed,
+``read_socket`` reads export-format lines from a TCP socket and
+``serve_csv`` serves a file as such a socket for local testing. When the
+queue is full the source waits, so a slow consumer slows the replay down
+or stops reading the socket, and TCP pushes back on the sender. The
+consumer drains the queue in batches, feeds ``StreamingIntraBarZigzag``
+and records latency histograms from a tick's arrival to the bar close and
+to the swings it confirms. Ticks older than the last one are dropped and
+counted rather than stopping the consumer.
+"""
+import asyncio
+import bisect
+import inspect
+import logging
+from time import monotonic_ns
+
+import numpy as np
+
+from streaming import StreamingIntraBarZigzag
+from tick_loader import TIME_COLUMN, load_tick_arrays
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram in nanoseconds, ``buckets_per_decade`` buckets per power of ten."""
+
+    def __init__(self, min_ns: int = 1_000, max_ns: int = 10_000_000_000, buckets_per_decade: int = 20) -> None:
+        n_decades = np.log10(max_ns / min_ns)
+        self.edges = np.geomspace(min_ns, max_ns, int(round(n_decades * buckets_per_decade)) + 1).tolist()
+        # One underflow and one overflow bucket around the edges
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, latency_ns: int) -> None:
+        self.counts[bisect.bisect_right(self.edges, latency_ns)] += 1
+        self.count += 1
+        self.total += latency_ns
+        self.max = max(self.max, latency_ns)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the ``q``-th percentile, in ns."""
+        if not self.count:
+            return float('nan')
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.edges[i], self.max) if i < len(self.edges) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        """Count, mean, p50/p90/p99/p99.9 and max, in microseconds."""
+        if not self.count:
+            return {'count': 0}
+        summary = {'count': self.count, 'mean_us': self.total / self.count / 1e3}
+        for q in (50, 90, 99, 99.9):
+            summary[f'p{q:g}_us'] = self.percentile(q) / 1e3
+        summary['max_us'] = self.max / 1e3
+        return summary
+
+
+class LiveIntraBarZigzag:
+    def __init__(self, resample_frequency: int, max_queue: int = 10_000, batch_size: int = 512, on_swing=None,
+                 candle_properties: dict = None, connection_rules: dict = None,
+                 log_level: int = logging.DEBUG) -> None:
+        """``on_swing(swing)`` may be a function or a coroutine function; without it swings collect in ``swings``."""
+        self.zigzag = StreamingIntraBarZigzag(resample_frequency, candle_properties, connection_rules)
+        self.queue = asyncio.Queue(max_queue)
+        self.batch_size = batch_size
+        self.on_swing = on_swing
+        self.swings = []
+        self.log_level = log_level
+
+        # Latency from a tick's arrival to the bar it closes and to the swings that confirms
+        self.bar_latency = LatencyHistogram()
+        self.swing_latency = LatencyHistogram()
+        self.stats = {'ticks': 0, 'bars': 0, 'swings': 0, 'dropped_ticks': 0, 'max_queue_depth': 0,
+                      'source_wait_seconds': 0.0}
+
+    async def put(self, time, price: float, arrival_ns: int = None) -> None:
+        """Queue one tick, waiting while the queue is full; ``arrival_ns`` defaults to now (``monotonic_ns``)."""
+        if arrival_ns is None:
+            arrival_ns = monotonic_ns()
+        if self.queue.full():
+            start = monotonic_ns()
+            await self.queue.put((time, price, arrival_ns))
+            self.stats['source_wait_seconds'] += (monotonic_ns() - start) / 1e9
+        else:
+            self.queue.put_nowait((time, price, arrival_ns))
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.queue.qsize())
+
+    async def close(self) -> None:
+        """End of feed: the consumer flushes the open bar and returns."""
+        await self.queue.put(None)
+
+    async def consume(self) -> None:
+        """Process queued ticks until ``close``."""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            for item in batch:
+                if item is None:
+                    await self._emit(self.zigzag.flush(), None)
+                    logger.log(self.log_level, 'live feed closed: %d ticks, %d bars, %d swings',
+                               self.stats['ticks'], self.stats['bars'], self.stats['swings'])
+                    return
+                time, price, arrival_ns = item
+                bars_closed = self.zigzag.bars_closed
+                try:
+                    swings = self.zigzag.on_tick(time, price)
+                except ValueError:
+                    # A late tick; raising would stop the consumer and leave the sources waiting on a full queue
+                    self.stats['dropped_ticks'] += 1
+                    logger.warning('dropped a tick older than the last one: %s', time)
+                    continue
+                self.stats['ticks'] += 1
+                if self.zigzag.bars_closed != bars_closed:
+                    self.bar_latency.record(monotonic_ns() - arrival_ns)
+                    self.stats['bars'] += 1
+                if swings:
+                    await self._emit(swings, arrival_ns)
+            # Let the sources run between batches
+            await asyncio.sleep(0)
+
+    async def run(self, source) -> None:
+        """Run ``source`` (a coroutine that puts ticks and closes) and the consumer together."""
+        await asyncio.gather(source, self.consume())
+
+    def latency_summary(self) -> dict:
+        return {'bar_close': self.bar_latency.summary(), 'swing': self.swing_latency.summary()}
+
+    async def _emit(self, swings: list, arrival_ns) -> None:
+        for swing in swings:
+            if arrival_ns is not None:
+                self.swing_latency.record(monotonic_ns() - arrival_ns)
+            self.stats['swings'] += 1
+            if self.on_swing is None:
+                self.swings.append(swing)
+                continue
+            result = self.on_swing(swing)
+            if inspect.isawaitable(result):
+                await result
+
+
+async def replay_csv(live: LiveIntraBarZigzag, path: str, speed: float = 1.0, close: bool = True) -> None:
+    """Put the ticks of a CSV export into ``live``, ``speed`` times faster than they happened.
+
+    ``speed=None`` replays as fast as the consumer takes them.
+    """
+    arrays = load_tick_arrays(path)
+    times, prices = arrays[TIME_COLUMN], arrays['Bid']
+    loop = asyncio.get_running_loop()
+    start_wall = loop.time()
+    for time, price in zip(times.tolist(), prices.tolist()):
+        if speed is not None:
+            # Only sleep when more than a millisecond ahead of schedule
+            delay = start_wall + (time - times[0]) / 1e9 / speed - loop.time()
+            if delay > 1e-3:
+                await asyncio.sleep(delay)
+        await live.put(time, price)
+    if close:
+        await live.close()
+
+
+async def read_socket(live: LiveIntraBarZigzag, host: str, port: int, close: bool = True) -> None:
+    """Put ticks read from a TCP socket into ``live``, one export-format CSV line per tick.
+
+    A header line, if sent, gives the column positions. While ``live``'s
+    queue is full nothing is read, so the socket's buffers fill up and the
+    sender is slowed down.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    time_col, price_col = 0, 2
+    try:
+        while line := await reader.readline():
+            fields = line.decode().strip().split(',')
+            if TIME_COLUMN in fields:
+                time_col, price_col = fields.index(TIME_COLUMN), fields.index('Bid')
+                continue
+            if len(fields) <= max(time_col, price_col):
+                continue
+            time = np.datetime64(fields[time_col].replace(' ', 'T'), 'ns').astype(np.int64)
+            await live.put(int(time), float(fields[price_col]))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    if close:
+        await live.close()
+
+
+async def serve_csv(path: str, host: str = '127.0.0.1', port: int = 0, speed: float = None) -> asyncio.Server:
+    """Serve a CSV export over TCP to every client, at ``speed`` times real time (None for as fast as possible).
+
+    The bound port is ``server.sockets[0].getsockname()[1]``.
+    """
+    with open(path) as f:
+        header, *lines = [line for line in f.read().splitlines() if line]
+    times = load_tick_arrays(path)[TIME_COLUMN]
+
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        start_wall = loop.time()
+        writer.write((header + '\n').encode())
+        try:
+            for time, line in zip(times.tolist(), lines):
+                if speed is not None:
+                    delay = start_wall + (time - times[0]) / 1e9 / speed - loop.time()
+                    if delay > 1e-3:
+                        await asyncio.sleep(delay)
+                writer.write((line + '\n').encode())
+                # Waits while the client isn't reading
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,153 @@
+"""Process-pool intra-bar zigzag over trading days and symbols.
+
+Ticks are cut at the first bin boundary of every trading day, on the bins of
+the whole series, so no bar straddles two partitions. Workers build and
+classify their partition's bars with ``zigzag_core`` and detect them with a
+fresh detector. A fresh detector
+only differs from the serial one until it meets the first candle that can
+become candle1, so stitching replays just those leading candles from the
+previous partition's final state and keeps the rest of the worker's swings.
+The merged bars and swings are identical to a serial run.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from bar_aggregation import NAT, NS_PER_DAY, NS_PER_MINUTE, PRICE_TIME_COLUMNS, bars_frame, time_bar_edges
+from candle_classification import BLANK, CANDLE_TYPE_CODES
+from intra_bar_zigzag import IntraBarZigzag
+from swing_detection import SwingDetector
+from zigzag_core import build_bars, classify
+
+
+def run_parallel(tick_df: pd.DataFrame, resample_frequency: int, symbol_column: str = None,
+                 max_workers: int = None):
+    """Set up and detect ``tick_df`` with one process per trading day.
+
+    Returns an IntraBarZigzag as if ``runSetup`` and ``runDetection`` had run
+    on it, or, with ``symbol_column``, a dict of them keyed by symbol. The
+    partitions of every symbol share one pool.
+    """
+    if symbol_column is None:
+        groups = [(None, tick_df)]
+    else:
+        groups = [(symbol, group.drop(columns=symbol_column))
+                  for symbol, group in tick_df.groupby(symbol_column, sort=False)]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        jobs = []
+        for symbol, group in groups:
+            zigzag = IntraBarZigzag(group, resample_frequency)
+            zigzag.format_dataframe()
+            times, prices = zigzag._tick_arrays()
+            origin = times[0] - times[0] % NS_PER_DAY if len(times) else 0
+            futures = [
+                executor.submit(_run_partition, times[start:stop], prices[start:stop], resample_frequency, origin,
+                                zigzag.candle_properties, zigzag.connection_rules)
+                for start, stop in day_partitions(times, resample_frequency)
+            ]
+            jobs.append((symbol, zigzag, times, futures))
+
+        results = {}
+        for symbol, zigzag, times, futures in jobs:
+            _merge_partitions(zigzag, times, [future.result() for future in futures])
+            results[symbol] = zigzag
+    return results[None] if symbol_column is None else results
+
+
+def day_partitions(times: np.ndarray, resample_frequency: int) -> list:
+    """Non-empty ``[start, stop)`` tick ranges, one per trading day, cut on bin boundaries."""
+    if len(times) == 0:
+        return []
+    freq_ns = int(resample_frequency * NS_PER_MINUTE)
+    origin = times[0] - times[0] % NS_PER_DAY
+    n_days = (times[-1] - origin) // NS_PER_DAY + 1
+    # First bin that opens at or after each midnight
+    days = np.arange(1, n_days, dtype=np.int64) * NS_PER_DAY
+    cuts = origin + -(-days // freq_ns) * freq_ns
+    bounds = np.concatenate(([0], np.searchsorted(times, cuts, side='left'), [len(times)]))
+    return [(start, stop) for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()) if stop > start]
+
+
+def _run_partition(times: np.ndarray, prices: np.ndarray, resample_frequency: int, origin: int,
+                   candle_properties: dict, connection_rules: dict) -> dict:
+    start = perf_counter()
+    # Bins stay on the series' origin; weekends are only dropped once the partitions are merged
+    labels, starts = time_bar_edges(times, resample_frequency, origin)
+    bars = build_bars(times, prices, labels, starts)
+    codes = classify(bars)
+    resample_seconds = perf_counter() - start
+
+    start = perf_counter()
+    detector = SwingDetector(candle_properties, connection_rules)
+    swings = detector.run(codes, bars)
+
+    # Candles up to and including the first one that can become candle1
+    starter = np.asarray(detector.known)[codes] & (codes != CANDLE_TYPE_CODES['Single_Event'])
+    lead = int(np.argmax(starter)) + 1 if starter.any() else len(codes)
+    return {'labels': labels, 'bars': bars, 'codes': codes, 'swings': swings, 'lead': lead,
+            'state': detector.get_state(), 'candle1_bar': detector.candle1_bar,
+            'swing_bars': detector.swing_bars, 'swing_sources': detector.swing_sources,
+            'timings': {'resample': resample_seconds, 'detection': perf_counter() - start}}
+
+
+def _merge_partitions(zigzag: IntraBarZigzag, times: np.ndarray, parts: list) -> None:
+    freq_ns = int(zigzag.resample_frequency * NS_PER_MINUTE)
+    labels, _ = time_bar_edges(times[[0, -1]] if len(times) else times, zigzag.resample_frequency)
+    # Stages time the merge in this process; the workers' own seconds are summed separately
+    zigzag.metrics['worker_timings'] = {
+        stage: sum(part['timings'][stage] for part in parts) for stage in ('resample', 'detection')}
+
+    with zigzag._stage('resample'):
+        # Bins between partitions stay blank
+        bars = {}
+        for price_col, time_col in PRICE_TIME_COLUMNS:
+            bars[price_col] = np.full(len(labels), np.nan)
+            bars[time_col] = np.full(len(labels), NAT, dtype=np.int64)
+        bars['candle_type'] = np.full(len(labels), BLANK, dtype=np.int8)
+        part_rows = []
+        for part in parts:
+            rows = (part['labels'] - labels[0]) // freq_ns
+            for col, values in part['bars'].items():
+                bars[col][rows] = values
+            bars['candle_type'][rows] = part['codes']
+            part_rows.append(rows)
+        zigzag._record_bars(len(times), bars['candle_type'])
+        zigzag.resampled_df = bars_frame(labels, bars)
+    zigzag._exclude_weekends()
+
+    with zigzag._stage('detection'):
+        detector = SwingDetector(zigzag.candle_properties, zigzag.connection_rules)
+        swings = []
+        # Merged row of every swing's bar, and of the current candle1
+        swing_rows = []
+        candle1_row = -1
+        for part, rows in zip(parts, part_rows):
+            # Replay the seam from the previous partition's candle1
+            if detector.candle1_back is not None:
+                lead = part['lead']
+                seam = {col: values[:lead] for col, values in part['bars'].items()}
+                swings.append((*detector.run(part['codes'][:lead], seam), detector.swing_sources))
+                swing_rows.append(np.where(detector.swing_bars < 0, candle1_row, rows[detector.swing_bars]))
+                if detector.candle1_bar >= 0:
+                    candle1_row = rows[detector.candle1_bar]
+            # A fresh detector's swings never reach back before its partition
+            swings.append((*part['swings'], part['swing_sources']))
+            swing_rows.append(rows[part['swing_bars']])
+            if part['state'][0] is not None:
+                detector.set_state(part['state'])
+                candle1_row = rows[part['candle1_bar']]
+
+        if swings:
+            times, prices, types, sources = (np.concatenate(columns) for columns in zip(*swings))
+            # Merged rows to rows of resampled_df, which lost the weekends
+            kept_labels = zigzag.resampled_df.index.values.astype('datetime64[ns]', copy=False).view(np.int64)
+            swing_bars = np.searchsorted(kept_labels, labels[np.concatenate(swing_rows)])
+            zigzag._set_swings(times, prices, types, swing_bars, sources)
+        else:
+            zigzag._set_swings(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int8),
+                               np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8))
+        # Metrics count the bars detection saw, i.e. after weekend exclusion, like the serial run
+        zigzag._record_detection(zigzag.resampled_df['candle_type'].cat.codes.to_numpy(), detector)
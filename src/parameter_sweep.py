@@ -0,0 +1,111 @@
+"""Parallel sweep of bar sampling configurations over one set of ticks.
+
+The ticks are loaded and sorted once, and their times, Bid and (only when
+a sampler bins on volume) total volume are copied into shared memory. Pool
+workers attach to it and build zero-copy NumPy views, so a configuration is
+fanned out as nothing more than its bar sampler. Each worker runs
+``zigzag_core.run_zigzag`` on its sampler's bars (time bars use the sparse
+setup, so empty bins never exist) and returns one row of summary statistics.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from bar_samplers import TickBarSampler, TimeBarSampler, VolumeBarSampler
+from candle_classification import BLANK, CANDLE_TYPES
+from zigzag_core import run_zigzag, tick_arrays
+
+# Tick arrays of a worker process, set up by _attach
+_ticks = {}
+
+
+def sampling_grid(frequencies: list = (), tick_counts: list = (), volumes: list = ()) -> list:
+    """Bar samplers for every minute frequency, ticks-per-bar count and volume-per-bar threshold."""
+    return ([TimeBarSampler(freq) for freq in frequencies]
+            + [TickBarSampler(n) for n in tick_counts]
+            + [VolumeBarSampler(volume) for volume in volumes])
+
+
+def run_sweep(ticks, samplers: list, max_workers: int = None, candle_properties: dict = None,
+              connection_rules: dict = None) -> pd.DataFrame:
+    """Summary statistics of every sampler in ``samplers``, one row each, in order.
+
+    ``ticks`` is a tick export dataframe or ``load_tick_arrays``-style
+    arrays. Columns: bar and blank-bar counts, one count per candle type,
+    swing count, leg size and duration stats, and the worker's seconds.
+    """
+    # Volumes are only read and shared when a sampler bins on them
+    with_volumes = any(not isinstance(sampler, (TimeBarSampler, TickBarSampler)) for sampler in samplers)
+    times, prices, volumes = _tick_columns(ticks, with_volumes)
+    blocks = []
+    try:
+        names = {}
+        for name, values in (('time', times), ('price', prices), ('volume', volumes)):
+            if values is None:
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+            names[name] = (block.name, values.dtype.str, len(values))
+        del times, prices, volumes
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach, initargs=(names,)) as executor:
+            rows = list(executor.map(_run_config, samplers, [candle_properties] * len(samplers),
+                                     [connection_rules] * len(samplers)))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return pd.DataFrame(rows)
+
+
+def _tick_columns(ticks, with_volumes: bool) -> tuple:
+    if not with_volumes:
+        return (*tick_arrays(ticks), None)
+    times, prices, ask_volumes, bid_volumes = tick_arrays(ticks, None, 'AskVolume', 'BidVolume')
+    volumes = None if ask_volumes is None or bid_volumes is None else ask_volumes + bid_volumes
+    return times, prices, volumes
+
+
+def _attach(names: dict) -> None:
+    for name, (block_name, dtype, length) in names.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        # Keep the block open for the life of the worker
+        _ticks[name + '_block'] = block
+        _ticks[name] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _run_config(sampler, candle_properties: dict, connection_rules: dict) -> dict:
+    start = perf_counter()
+    times, prices, volumes = _ticks['time'], _ticks['price'], _ticks.get('volume')
+    # Time bars use the sparse setup; its gaps are blank bars unless they are weekends
+    result = run_zigzag(times, prices, bar_sampler=sampler, volumes=volumes,
+                        sparse=isinstance(sampler, TimeBarSampler), candle_properties=candle_properties,
+                        connection_rules=connection_rules)
+    codes = result['bars']['candle_type']
+    swing_times, swing_prices = result['swings'].times, result['swings'].prices
+    n_blank = 0
+    if 'gaps' in result:
+        gaps = result['gaps']
+        n_blank = int(gaps['length'][~gaps['weekend']].sum())
+
+    counts = np.bincount(codes, minlength=len(CANDLE_TYPES))
+    counts[BLANK] += n_blank
+    leg_sizes = np.abs(np.diff(swing_prices))
+    leg_seconds = np.diff(swing_times) / 1e9
+    row = {
+        'sampler': repr(sampler),
+        'n_bars': len(codes) + n_blank,
+        'n_blank': int(counts[BLANK]),
+        'n_swings': len(swing_times),
+        'leg_size_mean': float(leg_sizes.mean()) if len(leg_sizes) else np.nan,
+        'leg_size_median': float(np.median(leg_sizes)) if len(leg_sizes) else np.nan,
+        'leg_seconds_mean': float(leg_seconds.mean()) if len(leg_seconds) else np.nan,
+        'leg_seconds_median': float(np.median(leg_seconds)) if len(leg_seconds) else np.nan,
+    }
+    row.update({f'candles_{name}': int(count) for name, count in zip(CANDLE_TYPES, counts)})
+    row['seconds'] = perf_counter() - start
+    return row
@@ -0,0 +1,229 @@
+"""Range max/min index over a tick price array.
+
+``RangeExtremeIndex`` answers "max/min and its position between tick i and
+j" in constant time with block decomposition: every block of ``block_size``
+ticks stores the in-block prefix and suffix argmax/argmin as small offsets,
+and a sparse table over whole blocks covers the middle of a range. Ties
+resolve to the first tick, like ``idxmax``/``idxmin``. Queries take scalars
+or arrays of ranges. Values keep their dtype (float or scaled integer prices)
+and tables are built a chunk of ticks at a time, so building needs little
+memory beyond the uint8 tables themselves.
+"""
+import numpy as np
+
+# Ticks per chunk when building tables
+BUILD_CHUNK = 1 << 16
+
+
+class RangeExtremeIndex:
+    def __init__(self, values: np.ndarray, times: np.ndarray = None, block_size: int = 64) -> None:
+        if not 1 <= block_size <= 256:
+            raise ValueError('block_size must be between 1 and 256')
+        self.values = np.asarray(values)
+        self.times = times
+        self.block_size = block_size
+        self.n_blocks = -(-len(self.values) // block_size)
+        # Built on first use, per kind
+        self._tables = {}
+
+    def argmax(self, start, stop):
+        """Position of the first maximum of ``values[start:stop]``; ranges must be non-empty."""
+        return self._query(start, stop, 'max')
+
+    def argmin(self, start, stop):
+        """Position of the first minimum of ``values[start:stop]``; ranges must be non-empty."""
+        return self._query(start, stop, 'min')
+
+    def max(self, start, stop):
+        return self.values[self.argmax(start, stop)]
+
+    def min(self, start, stop):
+        return self.values[self.argmin(start, stop)]
+
+    def release(self, kind: str = None) -> None:
+        """Free the tables of one kind (``'max'``/``'min'``), or all of them; they are rebuilt on next use."""
+        for key in list(self._tables):
+            if kind is None or key in (kind, 'short_' + kind):
+                del self._tables[key]
+
+    def time_range(self, start_time, end_time):
+        """Tick range ``[start, stop)`` of every tick with ``start_time <= time <= end_time``.
+
+        This is the window ``df.loc[start_time:end_time]`` selects. Needs ``times``.
+        """
+        if self.times is None:
+            raise ValueError('RangeExtremeIndex was built without times')
+        start = np.searchsorted(self.times, start_time, side='left')
+        stop = np.searchsorted(self.times, end_time, side='right')
+        return start, stop
+
+    def argmax_between_times(self, start_time, end_time):
+        """Position of the highest tick between two times, both ends inclusive."""
+        return self.argmax(*self.time_range(start_time, end_time))
+
+    def argmin_between_times(self, start_time, end_time):
+        """Position of the lowest tick between two times, both ends inclusive."""
+        return self.argmin(*self.time_range(start_time, end_time))
+
+    def _query(self, start, stop, kind: str):
+        scalar = np.ndim(start) == 0 and np.ndim(stop) == 0
+        start = np.atleast_1d(np.asarray(start, dtype=np.int64))
+        stop = np.atleast_1d(np.asarray(stop, dtype=np.int64))
+        start, stop = np.broadcast_arrays(start, stop)
+        if np.any(stop <= start):
+            raise ValueError('empty range')
+        prefix, suffix, sparse = self._build(kind)
+        better = np.greater if kind == 'max' else np.less
+        values = self.values
+        size = self.block_size
+
+        last = stop - 1
+        first_block = start // size
+        last_block = last // size
+        result = np.empty(len(start), dtype=np.int64)
+
+        # Ranges spanning blocks: tail of the first block, whole blocks, head of the last block
+        span = first_block != last_block
+        if span.any():
+            lo, hi = start[span], last[span]
+            lo_block, hi_block = first_block[span], last_block[span]
+            best = lo_block * size + suffix[lo]
+            middle = hi_block - lo_block - 1
+            has_middle = middle > 0
+            if has_middle.any():
+                m0 = lo_block[has_middle] + 1
+                m1 = hi_block[has_middle] - 1
+                level = np.log2(m1 - m0 + 1).astype(np.int64)
+                left = sparse[level, m0]
+                right = sparse[level, m1 - (1 << level) + 1]
+                mid = np.where(better(values[right], values[left]), right, left)
+                cur = best[has_middle]
+                best[has_middle] = np.where(better(values[mid], values[cur]), mid, cur)
+            head = hi_block * size + prefix[hi]
+            best = np.where(better(values[head], values[best]), head, best)
+            result[span] = best
+
+        # Ranges inside one block
+        inside = ~span
+        if inside.any():
+            lo, hi, block = start[inside], last[inside], first_block[inside]
+            from_block_start = lo == block * size
+            to_block_end = (hi == (block + 1) * size - 1) | (hi == len(values) - 1)
+            best = np.where(from_block_start, block * size + prefix[hi], block * size + suffix[lo])
+            # Ranges strictly inside a block use the short-range table
+            inner = ~from_block_start & ~to_block_end
+            if inner.any():
+                best[inner] = self._short_query(lo[inner], hi[inner], kind)
+            result[inside] = best
+
+        return int(result[0]) if scalar else result
+
+    def _short_query(self, lo: np.ndarray, hi: np.ndarray, kind: str) -> np.ndarray:
+        """Argmax/argmin of ranges ``[lo, hi]`` shorter than a block, from two overlapping windows."""
+        short = self._build_short(kind)
+        better = np.greater if kind == 'max' else np.less
+        level = np.log2(hi - lo + 1).astype(np.int64)
+        right = hi - np.left_shift(1, level) + 1
+        left = lo + short[level, lo]
+        right = right + short[level, right]
+        return np.where(better(self.values[right], self.values[left]), right, left)
+
+    def _build_short(self, kind: str) -> np.ndarray:
+        # Level k holds the offset of the first extreme in [i, i + 2**k), capped at the array end
+        key = 'short_' + kind
+        if key in self._tables:
+            return self._tables[key]
+        n = len(self.values)
+        levels = 1
+        while (1 << levels) < self.block_size and (1 << (levels - 1)) < n:
+            levels += 1
+        short = np.zeros((levels, n), dtype=np.uint8)
+        # Windows are shorter than a block, so a block of overlap makes chunks independent
+        for start in range(0, n, BUILD_CHUNK):
+            stop = min(start + BUILD_CHUNK, n)
+            chunk = self._short_levels(self.values[start:min(stop + self.block_size, n)], levels, kind)
+            short[:, start:stop] = chunk[:, :stop - start]
+        self._tables[key] = short
+        return short
+
+    def _short_levels(self, values: np.ndarray, levels: int, kind: str) -> np.ndarray:
+        better = np.greater if kind == 'max' else np.less
+        reduce = np.maximum if kind == 'max' else np.minimum
+        short = np.zeros((levels, len(values)), dtype=np.uint8)
+        extreme = values
+        for level in range(1, levels):
+            width = 1 << (level - 1)
+            if width >= len(values):
+                short[level] = short[level - 1]
+                continue
+            # Windows near the end are already capped, they keep the previous level
+            previous = short[level - 1]
+            take_right = better(extreme[width:], extreme[:-width])
+            short[level] = previous
+            short[level, :-width] = np.where(take_right, previous[width:] + width, previous[:-width])
+            extreme = np.concatenate((reduce(extreme[:-width], extreme[width:]), extreme[-width:]))
+        return short
+
+    def _build(self, kind: str):
+        if kind in self._tables:
+            return self._tables[kind]
+        size, n_blocks = self.block_size, self.n_blocks
+        n = len(self.values)
+        better = np.greater if kind == 'max' else np.less
+
+        prefix = np.empty(n, dtype=np.uint8)
+        suffix = np.empty(n, dtype=np.uint8)
+        block_best = np.empty(n_blocks, dtype=np.int64)
+        # Whole blocks per chunk
+        chunk_blocks = max(1, BUILD_CHUNK // size)
+        for first_block in range(0, n_blocks, chunk_blocks):
+            last_block = min(first_block + chunk_blocks, n_blocks)
+            start, stop = first_block * size, min(last_block * size, n)
+            chunk_prefix, chunk_suffix, chunk_best = self._block_offsets(self.values[start:stop],
+                                                                         last_block - first_block, kind)
+            prefix[start:stop] = chunk_prefix
+            suffix[start:stop] = chunk_suffix
+            block_best[first_block:last_block] = np.arange(first_block, last_block) * size + chunk_best
+
+        # Sparse table over whole blocks, global positions
+        levels = max(1, int(np.log2(n_blocks)) + 1) if n_blocks else 1
+        sparse = np.zeros((levels, n_blocks), dtype=np.int64)
+        sparse[0] = block_best
+        for level in range(1, levels):
+            width = 1 << (level - 1)
+            left = sparse[level - 1, :n_blocks - width]
+            right = sparse[level - 1, width:]
+            sparse[level, :n_blocks - width] = np.where(better(self.values[right], self.values[left]), right, left)
+
+        tables = (prefix, suffix, sparse)
+        self._tables[kind] = tables
+        return tables
+
+    def _block_offsets(self, values: np.ndarray, n_blocks: int, kind: str):
+        """In-block prefix and suffix extreme offsets of ``values``, and the offset of each block's extreme."""
+        size = self.block_size
+        n = len(values)
+        if np.issubdtype(values.dtype, np.floating):
+            fill = -np.inf if kind == 'max' else np.inf
+        else:
+            fill = np.iinfo(values.dtype).min if kind == 'max' else np.iinfo(values.dtype).max
+        accumulate = np.maximum.accumulate if kind == 'max' else np.minimum.accumulate
+
+        blocks = np.full(n_blocks * size, fill, dtype=values.dtype)
+        blocks[:n] = values
+        blocks = blocks.reshape(n_blocks, size)
+        offsets = np.arange(size, dtype=np.uint16)
+
+        # Prefix: the running extreme changes exactly at its first occurrence
+        running = accumulate(blocks, axis=1)
+        record = np.ones_like(running, dtype=bool)
+        record[:, 1:] = running[:, 1:] != running[:, :-1]
+        prefix = np.maximum.accumulate(np.where(record, offsets, 0), axis=1)
+
+        # Suffix: nearest tick to the right that equals the suffix extreme
+        suffix_running = accumulate(blocks[:, ::-1], axis=1)[:, ::-1]
+        hit = blocks == suffix_running
+        suffix = np.minimum.accumulate(np.where(hit, offsets, size)[:, ::-1], axis=1)[:, ::-1]
+
+        # Padding never becomes a new extreme, so the last column is the whole block
+        return prefix.astype(np.uint8).ravel()[:n], suffix.astype(np.uint8).ravel()[:n], prefix[:, -1]
@@ -0,0 +1,207 @@
+"""Tick-level reference zigzag and agreement scoring of intra-bar swings.
+
+``reference_zigzag`` runs a classic threshold zigzag straight on the tick
+prices: a high is confirmed once price falls ``threshold`` below the running
+max of the leg, a low once it rises ``threshold`` above the running min.
+Each leg is found with NumPy running extremes over a window that starts at
+twice the previous leg's length and doubles until the reversal shows up,
+so every tick is scanned a small constant number of times and Python only
+loops once per leg. The threshold is in price points, a percentage of the
+extreme, or a multiple of the ATR of the last completed ``atr_frequency``
+minute bars.
+
+``score_swings`` matches reference swings to an IntraBarZigzag's one to one
+by type, time and price tolerance, and ``agreement_table`` scores every
+resample frequency against every threshold.
+"""
+import numpy as np
+import pandas as pd
+
+from bar_aggregation import first_extreme, sparse_time_bar_edges
+from swing_detection import SWING_TYPES
+from swing_series import SwingSeries
+
+HIGH, LOW = SWING_TYPES.index('high'), SWING_TYPES.index('low')
+THRESHOLD_MODES = ('points', 'percent', 'atr')
+# Smallest window a leg is searched in
+LEG_WINDOW = 256
+# Relative slack on the threshold, so moves of exactly threshold on a price grid count
+THRESHOLD_RTOL = 1e-9
+
+
+def reference_zigzag(times: np.ndarray, prices: np.ndarray, threshold: float, mode: str = 'points',
+                     atr_frequency: int = 5, atr_window: int = 14) -> SwingSeries:
+    """Confirmed swings of a ``threshold`` zigzag over sorted ticks.
+
+    ``mode`` is ``'points'`` (price units), ``'percent'`` (of the leg's
+    extreme, e.g. 0.1 for 0.1%) or ``'atr'`` (multiples of the mean true
+    range of the last ``atr_window`` completed ``atr_frequency``-minute bars;
+    no swing is confirmed before the first ATR exists). Ties resolve to the
+    first tick of the extreme. The last, unconfirmed extreme is not returned.
+    """
+    if mode not in THRESHOLD_MODES:
+        raise ValueError(f'mode must be one of {THRESHOLD_MODES}')
+    times = np.asarray(times, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    thresholds = _Thresholds(times, prices, threshold, mode, atr_frequency, atr_window)
+
+    positions, types = [], []
+    if len(prices):
+        # The first swing is whichever reversal completes first
+        first = [(leg, kind) for kind in (HIGH, LOW)
+                 if (leg := _next_swing(prices, 0, kind, thresholds)) is not None]
+        if first:
+            (extreme, reversal), kind = min(first, key=lambda found: found[0][1])
+            while True:
+                positions.append(extreme)
+                types.append(kind)
+                kind = LOW if kind == HIGH else HIGH
+                start = extreme + 1
+                leg = _next_swing(prices, start, kind, thresholds, 2 * (reversal - start))
+                if leg is None:
+                    break
+                extreme, reversal = leg
+
+    positions = np.array(positions, dtype=np.int64)
+    return SwingSeries(times[positions], prices[positions], np.array(types, dtype=np.int8))
+
+
+def score_swings(reference: SwingSeries, candidate: SwingSeries, time_tolerance='1min',
+                 price_tolerance: float = 0.0) -> dict:
+    """Match ``candidate`` swings to ``reference`` ones and score the agreement.
+
+    A match has the same type, a time within ``time_tolerance`` (anything
+    ``pd.Timedelta`` understands) and a price within ``price_tolerance``.
+    Every swing is matched at most once: of all pairs within tolerance, the
+    nearest in time are assigned first. Timing errors are candidate minus
+    reference, in seconds.
+    """
+    tolerance_ns = pd.Timedelta(time_tolerance).value
+    ref_idx, cand_idx = [], []
+    for kind in (HIGH, LOW):
+        ref = np.flatnonzero(reference.types == kind)
+        cand = np.flatnonzero(candidate.types == kind)
+        if not len(ref) or not len(cand):
+            continue
+        ref_times, cand_times = reference.times[ref], candidate.times[cand]
+        # Every (reference, candidate) pair within the time tolerance
+        lo = np.searchsorted(cand_times, ref_times - tolerance_ns, side='left')
+        hi = np.searchsorted(cand_times, ref_times + tolerance_ns, side='right')
+        counts = hi - lo
+        pair_ref = np.repeat(np.arange(len(ref)), counts)
+        pair_cand = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - lo, counts)
+        price_gap = np.abs(candidate.prices[cand[pair_cand]].astype(np.float64) - reference.prices[ref[pair_ref]])
+        ok = price_gap <= price_tolerance + THRESHOLD_RTOL * np.abs(reference.prices[ref[pair_ref]])
+        pair_ref, pair_cand = pair_ref[ok], pair_cand[ok]
+        # Closest pairs claim their swings first
+        order = np.argsort(np.abs(cand_times[pair_cand] - ref_times[pair_ref]), kind='stable')
+        ref_free = np.ones(len(ref), dtype=bool)
+        cand_free = np.ones(len(cand), dtype=bool)
+        kept_ref, kept_cand = [], []
+        for r, c in zip(pair_ref[order].tolist(), pair_cand[order].tolist()):
+            if ref_free[r] and cand_free[c]:
+                ref_free[r] = cand_free[c] = False
+                kept_ref.append(r)
+                kept_cand.append(c)
+        ref_idx.append(ref[np.array(kept_ref, dtype=np.int64)])
+        cand_idx.append(cand[np.array(kept_cand, dtype=np.int64)])
+
+    ref_idx = np.concatenate(ref_idx) if ref_idx else np.empty(0, dtype=np.int64)
+    cand_idx = np.concatenate(cand_idx) if cand_idx else np.empty(0, dtype=np.int64)
+    matched = len(ref_idx)
+    precision = matched / len(candidate) if len(candidate) else float('nan')
+    recall = matched / len(reference) if len(reference) else float('nan')
+    timing = (candidate.times[cand_idx] - reference.times[ref_idx]) / 1e9
+    return {
+        'n_reference': len(reference),
+        'n_candidate': len(candidate),
+        'matched': matched,
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if matched else 0.0,
+        'timing_error_mean': float(timing.mean()) if matched else float('nan'),
+        'timing_error_abs_median': float(np.median(np.abs(timing))) if matched else float('nan'),
+        'timing_error_abs_max': float(np.abs(timing).max()) if matched else float('nan'),
+    }
+
+
+def agreement_table(times: np.ndarray, prices: np.ndarray, zigzags: dict, thresholds: list, mode: str = 'points',
+                    time_tolerance='1min', price_tolerance: float = 0.0, **reference_kwargs) -> pd.DataFrame:
+    """``score_swings`` of every detected IntraBarZigzag in ``zigzags`` (keyed by resample frequency,
+    e.g. from ``runMultiTimeframe``) against the reference zigzag at every threshold.
+
+    Each reference is computed once and shared by all frequencies.
+    """
+    rows = []
+    for threshold in thresholds:
+        reference = reference_zigzag(times, prices, threshold, mode, **reference_kwargs)
+        for resample_frequency, zigzag in zigzags.items():
+            score = score_swings(reference, zigzag.swings, time_tolerance, price_tolerance)
+            rows.append({'threshold': threshold, 'resample_frequency': resample_frequency, **score})
+    return pd.DataFrame(rows).set_index(['threshold', 'resample_frequency'])
+
+
+class _Thresholds:
+    """Reversal test of a window of ticks against the running extreme."""
+
+    def __init__(self, times: np.ndarray, prices: np.ndarray, threshold: float, mode: str, atr_frequency: int,
+                 atr_window: int) -> None:
+        self.threshold = threshold
+        self.mode = mode
+        if mode == 'atr':
+            self.bar_starts, self.bar_thresholds = _atr_thresholds(times, prices, threshold, atr_frequency,
+                                                                   atr_window)
+
+    def moved(self, extreme: np.ndarray, window: np.ndarray, start: int, kind: int) -> np.ndarray:
+        move = extreme - window if kind == HIGH else window - extreme
+        if self.mode == 'points':
+            threshold = self.threshold
+        elif self.mode == 'percent':
+            threshold = np.abs(extreme) * (self.threshold / 100)
+        else:
+            threshold = self._tick_thresholds(start, start + len(window))
+        return move >= threshold * (1 - THRESHOLD_RTOL)
+
+    def _tick_thresholds(self, start: int, stop: int) -> np.ndarray:
+        # Expand only the bars this window overlaps
+        first = np.searchsorted(self.bar_starts, start, side='right') - 1
+        last = np.searchsorted(self.bar_starts, stop, side='left')
+        bounds = np.clip(np.append(self.bar_starts[first + 1:last], stop), start, stop)
+        counts = np.diff(np.concatenate(([start], bounds)))
+        return np.repeat(self.bar_thresholds[first:last], counts)
+
+
+def _atr_thresholds(times: np.ndarray, prices: np.ndarray, multiple: float, atr_frequency: int,
+                    atr_window: int) -> tuple[np.ndarray, np.ndarray]:
+    """First tick of every non-empty bar and the threshold its ticks use: ``multiple`` times the
+    ATR of the bars before it (NaN until ``atr_window`` bars have completed)."""
+    _, starts, _ = sparse_time_bar_edges(times, atr_frequency)
+    ends = np.append(starts[1:], len(times))
+    high = prices[first_extreme(prices, starts, ends, 'max')]
+    low = prices[first_extreme(prices, starts, ends, 'min')]
+    close = prices[ends - 1]
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high, previous_close) - np.fmin(low, previous_close)
+    sums = np.concatenate(([0.0], np.cumsum(true_range)))
+    atr = np.full(len(starts), np.nan)
+    # Bar i uses the mean true range of bars i - atr_window .. i - 1
+    atr[atr_window:] = (sums[atr_window:-1] - sums[:-atr_window - 1]) / atr_window
+    return starts, multiple * atr
+
+
+def _next_swing(prices: np.ndarray, start: int, kind: int, thresholds: _Thresholds, size: int = LEG_WINDOW):
+    """``(extreme, reversal)`` positions of the leg from ``start`` that ends in a ``kind`` swing, or None."""
+    size = max(size, LEG_WINDOW)
+    while start < len(prices):
+        stop = min(start + size, len(prices))
+        window = prices[start:stop]
+        extreme = np.maximum.accumulate(window) if kind == HIGH else np.minimum.accumulate(window)
+        hits = np.flatnonzero(thresholds.moved(extreme, window, start, kind))
+        if len(hits):
+            reversal = hits[0]
+            # First tick at the extreme
+            return start + int(np.flatnonzero(window[:reversal + 1] == extreme[reversal])[0]), start + int(reversal)
+        if stop == len(prices):
+            return None
+        size *= 2
+    return None
@@ -0,0 +1,154 @@
+"""Tick-by-tick intra-bar zigzag.
+
+Only the open bar's running state and the detector's candle1 are kept, so
+every tick costs O(1) and memory stays bounded however long the feed runs.
+"""
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from bar_aggregation import NAT, NS_PER_DAY, NS_PER_MINUTE, PRICE_TIME_COLUMNS, to_ns
+from candle_classification import classify_bars
+from swing_detection import SWING_TYPES, SwingDetector
+
+
+class RunningBar:
+    """Open, high, low, close and the four between pivots of the bar being built.
+
+    The between windows follow ``aggregate_bars``: they span whole timestamps
+    and ties resolve to the first tick.
+    """
+    __slots__ = (
+        'open_price', 'open_time', 'high_price', 'high_time', 'low_price', 'low_time',
+        'close_price', 'close_time',
+        'hbol_price', 'hbol_time', 'lbhc_price', 'lbhc_time',
+        'lboh_price', 'lboh_time', 'hblc_price', 'hblc_time',
+        'stamp_time', 'stamp_min', 'stamp_max', 'n_ticks',
+    )
+
+    def __init__(self, time: int, price: float) -> None:
+        self.open_price = self.high_price = self.low_price = self.close_price = price
+        self.open_time = self.high_time = self.low_time = self.close_time = time
+        self.hbol_price = self.lbhc_price = self.lboh_price = self.hblc_price = price
+        self.hbol_time = self.lbhc_time = self.lboh_time = self.hblc_time = time
+        # Extremes of the ticks sharing the latest timestamp
+        self.stamp_time = time
+        self.stamp_min = self.stamp_max = price
+        self.n_ticks = 1
+
+    def update(self, time: int, price: float) -> None:
+        if time != self.stamp_time:
+            self.stamp_time = time
+            self.stamp_min = self.stamp_max = price
+        elif price < self.stamp_min:
+            self.stamp_min = price
+        elif price > self.stamp_max:
+            self.stamp_max = price
+
+        if price > self.high_price:
+            self.high_price, self.high_time = price, time
+            # The window after the high starts at the first tick of its timestamp
+            self.lbhc_price, self.lbhc_time = self.stamp_min, time
+            # The window before the high now covers every tick so far
+            self.lboh_price, self.lboh_time = self.low_price, self.low_time
+        else:
+            if price < self.lbhc_price:
+                self.lbhc_price, self.lbhc_time = price, time
+            if time == self.high_time and price < self.lboh_price:
+                self.lboh_price, self.lboh_time = price, time
+
+        if price < self.low_price:
+            self.low_price, self.low_time = price, time
+            self.hblc_price, self.hblc_time = self.stamp_max, time
+            self.hbol_price, self.hbol_time = self.high_price, self.high_time
+        else:
+            if price > self.hblc_price:
+                self.hblc_price, self.hblc_time = price, time
+            if time == self.low_time and price > self.hbol_price:
+                self.hbol_price, self.hbol_time = price, time
+
+        self.close_price, self.close_time = price, time
+        self.n_ticks += 1
+
+    def get_state(self) -> dict:
+        """Running state as plain Python numbers, for checkpoints."""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'RunningBar':
+        bar = cls.__new__(cls)
+        for slot in cls.__slots__:
+            setattr(bar, slot, state[slot])
+        return bar
+
+    def to_bar(self) -> dict:
+        """Bar columns of length one, laid out like ``aggregate_bars``."""
+        values = (
+            (self.open_price, self.open_time), (self.high_price, self.high_time),
+            (self.low_price, self.low_time), (self.close_price, self.close_time),
+            (self.hbol_price, self.hbol_time), (self.lbhc_price, self.lbhc_time),
+            (self.lboh_price, self.lboh_time), (self.hblc_price, self.hblc_time),
+        )
+        bar = {}
+        for (price_col, time_col), (price, time) in zip(PRICE_TIME_COLUMNS, values):
+            bar[price_col] = np.array([price], dtype=np.float64)
+            bar[time_col] = np.array([time], dtype=np.int64)
+        return bar
+
+
+class StreamingIntraBarZigzag:
+    def __init__(self, resample_frequency: int, candle_properties: dict = None, connection_rules: dict = None) -> None:
+        self.resample_frequency = resample_frequency
+        self.freq_ns = int(resample_frequency * NS_PER_MINUTE)
+        self.detector = SwingDetector(candle_properties, connection_rules)
+
+        # Bins are anchored at midnight of the first tick's day, like resample()
+        self.origin = None
+        self.bar_id = None
+        self.bar = None
+        self.last_time = NAT
+        self.bars_closed = 0
+
+    def on_tick(self, time, price: float) -> list:
+        """Add one tick; returns the swings confirmed by a bar it closed."""
+        time = to_ns(time)
+        if time < self.last_time:
+            raise ValueError('ticks must arrive in time order')
+        self.last_time = time
+
+        if self.origin is None:
+            self.origin = time - time % NS_PER_DAY
+        bar_id = (time - self.origin) // self.freq_ns
+        if bar_id == self.bar_id:
+            self.bar.update(time, price)
+            return []
+
+        swings = self._close_bar()
+        self.bar_id = bar_id
+        self.bar = RunningBar(time, price)
+        return swings
+
+    def flush(self) -> list:
+        """Close the open bar at the end of the feed and return its swings."""
+        swings = self._close_bar()
+        self.bar_id = None
+        self.bar = None
+        return swings
+
+    def run(self, ticks: Iterable) -> Iterator[dict]:
+        """Yield swings from an iterable of ``(time, price)`` pairs, flushing at the end."""
+        for time, price in ticks:
+            yield from self.on_tick(time, price)
+        yield from self.flush()
+
+    def _close_bar(self) -> list:
+        if self.bar is None:
+            return []
+        bar = self.bar.to_bar()
+        codes = classify_bars(bar)
+        times, prices, types = self.detector.run(codes, bar)
+        self.bars_closed += 1
+        return [
+            {'time': np.datetime64(time, 'ns'), 'price': price, 'type': SWING_TYPES[swing_type]}
+            for time, price, swing_type in zip(times.tolist(), prices.tolist(), types.tolist())
+        ]
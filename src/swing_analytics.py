@@ -0,0 +1,126 @@
+"""Vectorised statistics over detected swings.
+
+``swing_legs`` turns a SwingSeries into one row per leg (consecutive swing
+pair) with its amplitude, duration, tick count and retracement of the leg
+before. ``leg_stats`` summarises legs overall, per day or per session and
+``rolling_leg_stats`` over a rolling time window. ``swing_attribution``
+joins every swing back to the ``resampled_df`` bar, candle type and pivot
+it was taken from.
+"""
+import numpy as np
+import pandas as pd
+
+from swing_detection import HIGH, SWING_SOURCES
+from swing_series import SwingSeries
+
+# Trading sessions as [start, end) hours of the tick clock (EET)
+SESSIONS = {'asia': (0, 10), 'london': (10, 15), 'new_york': (15, 24)}
+
+
+def swing_legs(swings: SwingSeries, tick_times: np.ndarray = None) -> pd.DataFrame:
+    """One row per leg between consecutive swings.
+
+    ``amplitude`` is the absolute price move, ``retracement`` the amplitude
+    over the previous leg's. With ``tick_times`` (sorted int64 ns or
+    datetime64), ``n_ticks`` counts the ticks from the leg's start to its end,
+    both included.
+    """
+    times, prices = swings.times, swings.prices.astype(np.float64)
+    start_times, end_times = times[:-1], times[1:]
+    amplitude = np.abs(np.diff(prices))
+    # A leg that starts at a high goes down
+    direction = pd.Categorical.from_codes((swings.types[:-1] == HIGH).astype(np.int8), categories=['up', 'down'])
+    legs = pd.DataFrame({
+        'start_time': start_times.view('datetime64[ns]'),
+        'end_time': end_times.view('datetime64[ns]'),
+        'start_price': prices[:-1],
+        'end_price': prices[1:],
+        'direction': direction,
+        'amplitude': amplitude,
+        'duration': (end_times - start_times).view('timedelta64[ns]'),
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        legs['retracement'] = np.concatenate(([np.nan], amplitude[1:] / amplitude[:-1])) if len(amplitude) else []
+    if tick_times is not None:
+        tick_times = np.asarray(tick_times)
+        if not np.issubdtype(tick_times.dtype, np.integer):
+            tick_times = tick_times.astype('datetime64[ns]', copy=False).view(np.int64)
+        legs['n_ticks'] = (np.searchsorted(tick_times, end_times, side='right')
+                           - np.searchsorted(tick_times, start_times, side='left'))
+    return legs
+
+
+def leg_stats(legs: pd.DataFrame, by: str = None, sessions: dict = SESSIONS) -> pd.DataFrame:
+    """Count, amplitude, duration, tick and retracement statistics of ``legs``.
+
+    ``by`` is None for one row, ``'day'`` per calendar day or ``'session'``
+    per entry of ``sessions``; legs are grouped by their start time.
+    """
+    values = legs.assign(duration_seconds=legs['duration'].dt.total_seconds())
+    aggregations = {
+        'n_legs': ('amplitude', 'size'),
+        'amplitude_mean': ('amplitude', 'mean'),
+        'amplitude_median': ('amplitude', 'median'),
+        'amplitude_max': ('amplitude', 'max'),
+        'duration_seconds_mean': ('duration_seconds', 'mean'),
+        'duration_seconds_median': ('duration_seconds', 'median'),
+        'retracement_median': ('retracement', 'median'),
+    }
+    if 'n_ticks' in values:
+        aggregations['n_ticks_mean'] = ('n_ticks', 'mean')
+    if by is None:
+        keys = np.zeros(len(values), dtype=np.int8)
+    elif by == 'day':
+        keys = values['start_time'].dt.floor('D').rename('day')
+    elif by == 'session':
+        keys = _session_keys(values['start_time'], sessions)
+    else:
+        raise ValueError("by must be None, 'day' or 'session'")
+    stats = values.groupby(keys, observed=True).agg(**aggregations)
+    return stats.reset_index(drop=True) if by is None else stats
+
+
+def rolling_leg_stats(legs: pd.DataFrame, window='1D') -> pd.DataFrame:
+    """Leg count, mean amplitude and mean duration over the trailing ``window``, at every leg's end."""
+    values = pd.DataFrame({
+        'amplitude': legs['amplitude'].to_numpy(),
+        'duration_seconds': legs['duration'].dt.total_seconds().to_numpy(),
+    }, index=pd.DatetimeIndex(legs['end_time'], name='time'))
+    rolling = values.rolling(window)
+    return pd.DataFrame({
+        'n_legs': rolling['amplitude'].count(),
+        'amplitude_mean': rolling['amplitude'].mean(),
+        'duration_seconds_mean': rolling['duration_seconds'].mean(),
+    })
+
+
+def swing_attribution(zigzag) -> pd.DataFrame:
+    """Every swing of a detected IntraBarZigzag with the bar, candle type and pivot it came from.
+
+    ``bar`` is the ``resampled_df`` label and ``source`` one of
+    ``SWING_SOURCES``: ``'close'`` (candle1's close at a connection),
+    ``'open'`` (candle2's open) or the pivot name, e.g. ``'high_betweenOpenLow'``.
+    """
+    if zigzag.swing_bars is None:
+        raise ValueError('these swings carry no bar attribution; run runDetection first')
+    swings = zigzag.swings.to_pandas()
+    bars = zigzag.resampled_df
+    swings['bar'] = bars.index[zigzag.swing_bars]
+    swings['candle_type'] = bars['candle_type'].iloc[zigzag.swing_bars].array
+    swings['source'] = pd.Categorical.from_codes(zigzag.swing_sources, categories=SWING_SOURCES)
+    return swings
+
+
+def source_distribution(zigzag) -> pd.DataFrame:
+    """Swing counts by the candle type (rows) and pivot (columns) that produced them."""
+    swings = swing_attribution(zigzag)
+    return pd.crosstab(swings['candle_type'], swings['source'])
+
+
+def _session_keys(start_times: pd.Series, sessions: dict) -> pd.Series:
+    hours = start_times.dt.hour.to_numpy()
+    names = list(sessions)
+    codes = np.full(len(hours), -1, dtype=np.int8)
+    for code, (first, last) in enumerate(sessions.values()):
+        codes[(hours >= first) & (hours < last)] = code
+    return pd.Series(pd.Categorical.from_codes(codes, categories=names), index=start_times.index, name='session')
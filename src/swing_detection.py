@@ -0,0 +1,426 @@
+"""Array-backed swing detection state machine.
+
+``connection_rules`` and ``candle_properties`` are encoded once as integer
+tables indexed by candle type code, and the detector walks the bar columns
+writing every swing into preallocated time/price/type arrays.
+"""
+import numpy as np
+
+from bar_aggregation import NAT, PRICE_TIME_COLUMNS
+from candle_classification import CANDLE_TYPE_CODES, CANDLE_TYPES
+
+# Default detection rules
+CONNECTION_RULES = {
+    ('+','+'): '_handle_continuation',
+    ('-','-'): '_handle_continuation',
+    ('+','-'): '_handle_reversal',
+    ('-','+'): '_handle_reversal',
+    ('+','.'): '_handle_Single_Event',
+    ('-','.'): '_handle_Single_Event'
+}
+CANDLE_PROPERTIES = {
+    # Bullish LH FullWick
+    'Bullish_LH_FullWick': {
+        'connectors': ('-','-'),
+        'pivots': ('low', 'high')
+    },
+    'Bullish_LH_FullWick_OpenUpDownToLow_PostHighDipBelowClose': {
+        'connectors': ('+','+'),
+        'pivots': ('high_betweenOpenLow', 'low', 'high', 'low_betweenHighClose')
+    },
+    'Bullish_LH_FullWick_OpenUpDownToLow': {
+        'connectors': ('+','-'),
+        'pivots': ('high_betweenOpenLow', 'low', 'high')
+    },
+    'Bullish_LH_FullWick_PostHighDipBelowClose': {
+        'connectors': ('-','+'),
+        'pivots': ('low', 'high', 'low_betweenHighClose')
+    },
+    # Bullish LH TopWick
+    'Bullish_LH_TopWick': {
+        'connectors': ('+','-'),
+        'pivots': ('high',)
+    },
+    'Bullish_LH_TopWick_PostHighDipBelowClose': {
+        'connectors': ('+','+'),
+        'pivots': ('high', 'low_betweenHighClose')
+    },
+    # Bullish LH BottomWick
+    'Bullish_LH_BottomWick': {
+        'connectors': ('-','+'),
+        'pivots': ('low',)
+    },
+    'Bullish_LH_BottomWick_OpenUpDownToLow': {
+        'connectors': ('+','+'),
+        'pivots': ('high_betweenOpenLow', 'low')
+    },
+    # Bullish LH NoWick
+    'Bullish_LH_NoWick': {
+        'connectors': ('+','+'),
+        'pivots': None
+    },
+    # Bullish HL FullWick
+    'Bullish_HL_FullWick': {
+        'connectors': ('+','+'),
+        'pivots': ('high','low')
+    },
+    'Bullish_HL_FullWick_OpenDownThenUpToHigh_PostLowRallyAboveClose': {
+        'connectors': ('-','-'),
+        'pivots': ('low_betweenOpenHigh','high','low','high_betweenLowClose')
+    },
+    'Bullish_HL_FullWick_OpenDownThenUpToHigh': {
+        'connectors': ('-','+'),
+        'pivots': ('low_betweenOpenHigh','high','low')
+    },
+    'Bullish_HL_FullWick_PostLowRallyAboveClose': {
+        'connectors': ('+','-'),
+        'pivots': ('high','low','high_betweenLowClose')
+    },
+    # Bullish HL BottomWick
+    'Bullish_HL_BottomWick': {
+        'connectors': ('+','+'),
+        'pivots': ('high','low')
+    },
+    'Bullish_HL_BottomWick_OpenDownThenUpToHigh': {
+        'connectors': ('-','+'),
+        'pivots': ('low_betweenOpenHigh', 'high', 'low')
+    },
+    # Bearish HL FullWick
+    'Bearish_HL_FullWick': {
+        'connectors': ('+','+'),
+        'pivots': ('high','low')
+    },
+    'Bearish_HL_FullWick_OpenDownThenUpToHigh_PostLowRallyAboveClose': {
+        'connectors': ('-','-'),
+        'pivots': ('low_betweenOpenHigh','high','low','high_betweenLowClose')
+    },
+    'Bearish_HL_FullWick_OpenDownThenUpToHigh': {
+        'connectors': ('-','+'),
+        'pivots': ('low_betweenOpenHigh','high','low')
+    },
+    'Bearish_HL_FullWick_PostLowRallyAboveClose': {
+        'connectors': ('+','-'),
+        'pivots': ('high','low','high_betweenLowClose')
+    },
+    # Bearish HL BottomWick
+    'Bearish_HL_BottomWick': {
+        'connectors': ('-','+'),
+        'pivots': ('low',)
+    },
+    'Bearish_HL_BottomWick_PostLowRallyAboveClose': {
+        'connectors': ('-','-'),
+        'pivots': ('low','high_betweenLowClose')
+    },
+    # Bearish HL TopWick
+    'Bearish_HL_TopWick': {
+        'connectors': ('+','-'),
+        'pivots': ('high',)
+    },
+    'Bearish_HL_TopWick_OpenDownThenUpToHigh': {
+        'connectors': ('-','-'),
+        'pivots': ('low_betweenOpenHigh','high')
+    },
+    # Bearish HL NoWick
+    'Bearish_HL_NoWick': {
+        'connectors': ('-','-'),
+        'pivots': None
+    },
+    # Bearish LH FullWick
+    'Bearish_LH_FullWick': {
+        'connectors': ('-','-'),
+        'pivots': ('low','high')
+    },
+    'Bearish_LH_FullWick_OpenUpDownToLow_PostHighDipBelowClose': {
+        'connectors': ('+','+'),
+        'pivots': ('high_betweenOpenLow','low','high','low_betweenHighClose')
+    },
+    'Bearish_LH_FullWick_OpenUpDownToLow': {
+        'connectors': ('+','-'),
+        'pivots': ('high_betweenOpenLow','low','high')
+    },
+    'Bearish_LH_FullWick_PostHighDipBelowClose': {
+        'connectors': ('-','+'),
+        'pivots': ('low','high','low_betweenHighClose')
+    },
+    # Bearish LH TopWick
+    'Bearish_LH_TopWick': {
+        'connectors': ('-','-'),
+        'pivots': ('low','high')
+    },
+    'Bearish_LH_TopWick_OpenUpDownToLow': {
+        'connectors': ('+','-'),
+        'pivots': ('high_betweenOpenLow','low','high')
+    },
+    # Doji LH
+    'Doji_LH_FullWick': {
+        'connectors': ('-','-'),
+        'pivots': ('low','high')
+    },
+    'Doji_LH_FullWick_OpenUpDownToLow_PostHighDipBelowClose': {
+        'connectors': ('+','+'),
+        'pivots': ('high_betweenOpenLow','low','high','low_betweenHighClose')
+    },
+    'Doji_LH_FullWick_OpenUpDownToLow': {
+        'connectors': ('+','-'),
+        'pivots': ('high_betweenOpenLow','low','high')
+    },
+    'Doji_LH_FullWick_PostHighDipBelowClose': {
+        'connectors': ('-','+'),
+        'pivots': ('low','high','low_betweenHighClose')
+    },
+    # Doji LH TopWick
+    'Doji_LH_TopWick': {
+        'connectors': ('+','-'),
+        'pivots': ('high',)
+    },
+    # Doji HL FullWick
+    'Doji_HL_FullWick': {
+        'connectors': ('+','+'),
+        'pivots': ('high','low')
+    },
+    'Doji_HL_FullWick_OpenDownThenUpToHigh_PostLowRallyAboveClose': {
+        'connectors': ('-','-'),
+        'pivots': ('low_betweenOpenHigh','high','low','high_betweenLowClose')
+    },
+    'Doji_HL_FullWick_OpenDownThenUpToHigh': {
+        'connectors': ('-','+'),
+        'pivots': ('low_betweenOpenHigh','high','low')
+    },
+    'Doji_HL_FullWick_PostLowRallyAboveClose': {
+        'connectors': ('+','-'),
+        'pivots': ('high','low','high_betweenLowClose')
+    },
+    # Doji HL BottomWick
+    'Doji_HL_BottomWick': {
+        'connectors': ('-','+'),
+        'pivots': ('low',)
+    },
+    # Single Event
+    'Single_Event': {
+        'connectors': ('.'),
+        'pivots': None
+    }
+}
+
+# Connectors
+PLUS, MINUS, DOT = 0, 1, 2
+CONNECTOR_CODES = {'+': PLUS, '-': MINUS, '.': DOT}
+
+# Handlers
+CONTINUATION, REVERSAL, SINGLE_EVENT = 0, 1, 2
+HANDLER_CODES = {
+    '_handle_continuation': CONTINUATION,
+    '_handle_reversal': REVERSAL,
+    '_handle_Single_Event': SINGLE_EVENT,
+}
+
+# Swing types
+HIGH, LOW = 0, 1
+SWING_TYPES = ('high', 'low')
+
+# Bar column and swing type of every pivot name
+PIVOT_COLUMNS = {
+    'high': ('high', HIGH),
+    'low': ('low', LOW),
+    # LH pivots
+    'high_betweenOpenLow': ('high_between_open_low', HIGH),
+    'low_betweenHighClose': ('low_between_high_close', LOW),
+    # HL pivots
+    'low_betweenOpenHigh': ('low_between_open_high', LOW),
+    'high_betweenLowClose': ('high_between_low_close', HIGH),
+}
+# What a swing was taken from: candle1's close or candle2's open at a connection, or a pivot of the candle
+SWING_SOURCES = ('close', 'open', *PIVOT_COLUMNS)
+CLOSE_SOURCE, OPEN_SOURCE = 0, 1
+# Largest number of swings one candle can add: two connection swings plus four pivots
+MAX_SWINGS_PER_CANDLE = 6
+# Bars converted to Python lists at a time, which bounds the memory a run needs
+RUN_CHUNK = 8192
+
+
+class SwingDetector:
+    def __init__(self, candle_properties: dict = None, connection_rules: dict = None) -> None:
+        candle_properties = CANDLE_PROPERTIES if candle_properties is None else candle_properties
+        connection_rules = CONNECTION_RULES if connection_rules is None else connection_rules
+
+        # Candle type tables, indexed by candle type code
+        n_types = len(CANDLE_TYPES)
+        self.known = [False] * n_types
+        self.front = [DOT] * n_types
+        self.back = [DOT] * n_types
+        self.pivots = [()] * n_types
+        for name, properties in candle_properties.items():
+            code = CANDLE_TYPE_CODES[name]
+            connectors = properties['connectors']
+            self.known[code] = True
+            # Single_Event's connectors are the bare string '.'
+            self.front[code] = CONNECTOR_CODES[connectors[0]]
+            self.back[code] = CONNECTOR_CODES[connectors[-1]]
+            self.pivots[code] = tuple((*PIVOT_COLUMNS[pivot], SWING_SOURCES.index(pivot))
+                                      for pivot in properties['pivots'] or ())
+        self.single_event = CANDLE_TYPE_CODES['Single_Event']
+
+        # Connection table, indexed by [candle1 back connector][candle2 front connector]
+        self.handlers = [[None] * 3 for _ in range(3)]
+        for (back, front), handler_name in connection_rules.items():
+            self.handlers[CONNECTOR_CODES[back]][CONNECTOR_CODES[front]] = HANDLER_CODES[handler_name]
+
+        self.reset()
+
+    def reset(self) -> None:
+        # Candle1 is reduced to what the handlers read from it
+        self.candle1_back = None
+        self.candle1_close_price = np.nan
+        self.candle1_close_time = NAT
+        self.candle1_bar = -1
+        # Bar and source of the swings of the last run, see run()
+        self.swing_bars = np.empty(0, dtype=np.int64)
+        self.swing_sources = np.empty(0, dtype=np.int8)
+
+    def get_state(self) -> tuple:
+        """Candle1 as a picklable tuple, to resume detection elsewhere with ``set_state``."""
+        return self.candle1_back, self.candle1_close_price, self.candle1_close_time
+
+    def set_state(self, state: tuple) -> None:
+        self.candle1_back, self.candle1_close_price, self.candle1_close_time = state
+
+    def run(self, codes: np.ndarray, bars: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Feed bars through the state machine and return their swings.
+
+        ``bars`` holds the resampled columns as arrays with int64 ns times.
+        State carries over between calls, so bars can be fed in pieces.
+        Afterwards ``swing_bars`` holds the position in ``codes`` of the bar
+        each swing came from (-1 for a candle1 from an earlier call) and
+        ``swing_sources`` its code into ``SWING_SOURCES``.
+        """
+        codes = np.asarray(codes)
+        # Candle1 came from an earlier call
+        self.candle1_bar = -1
+        if len(codes) <= RUN_CHUNK:
+            swings = self._run_chunk(codes, bars, 0)
+        else:
+            pieces = []
+            for start in range(0, len(codes), RUN_CHUNK):
+                chunk = {col: np.asarray(values)[start:start + RUN_CHUNK] for col, values in bars.items()}
+                pieces.append(self._run_chunk(codes[start:start + RUN_CHUNK], chunk, start))
+            swings = tuple(np.concatenate(columns) for columns in zip(*pieces))
+        *swings, self.swing_bars, self.swing_sources = swings
+        return tuple(swings)
+
+    def _run_chunk(self, codes: np.ndarray, bars: dict, offset: int) -> tuple:
+        codes = codes.tolist()
+        capacity = MAX_SWINGS_PER_CANDLE * len(codes)
+        swing_times = np.empty(capacity, dtype=np.int64)
+        swing_prices = np.empty(capacity, dtype=np.float64)
+        swing_types = np.empty(capacity, dtype=np.int8)
+        swing_bars = np.empty(capacity, dtype=np.int64)
+        swing_sources = np.empty(capacity, dtype=np.int8)
+        n_swings = 0
+
+        # Plain lists are much faster than arrays for scalar access
+        columns = {}
+        for price_col, time_col in PRICE_TIME_COLUMNS:
+            columns[price_col[:-len('_price')]] = (np.asarray(bars[time_col]).tolist(), np.asarray(bars[price_col]).tolist())
+        open_times, open_prices = columns['open']
+        close_times, close_prices = columns['close']
+        pivots = [tuple((columns[col][0], columns[col][1], swing_type, source)
+                        for col, swing_type, source in candle_pivots)
+                  for candle_pivots in self.pivots]
+
+        known, front, back, handlers = self.known, self.front, self.back, self.handlers
+        single_event = self.single_event
+        candle1_back = self.candle1_back
+        close1_price = self.candle1_close_price
+        close1_time = self.candle1_close_time
+        close1_bar = self.candle1_bar
+
+        for i, code in enumerate(codes):
+            # Blank and unknown candles are skipped
+            if not known[code]:
+                continue
+            if candle1_back is None:
+                if code == single_event:
+                    continue
+                candle1_back = back[code]
+                close1_price = close_prices[i]
+                close1_time = close_times[i]
+                close1_bar = offset + i
+                continue
+
+            handler = handlers[candle1_back][front[code]]
+            if handler is None:
+                raise KeyError((candle1_back, front[code]))
+            open2_price = open_prices[i]
+            candle2_back = back[code]
+
+            if handler == CONTINUATION:
+                # (++) and candle2 opens below candle1's close: high at the close, low at the open
+                if candle1_back == PLUS and open2_price < close1_price:
+                    swing_times[n_swings], swing_prices[n_swings], swing_types[n_swings] = close1_time, close1_price, HIGH
+                    swing_times[n_swings + 1], swing_prices[n_swings + 1], swing_types[n_swings + 1] = open_times[i], open2_price, LOW
+                    swing_bars[n_swings], swing_sources[n_swings] = close1_bar, CLOSE_SOURCE
+                    swing_bars[n_swings + 1], swing_sources[n_swings + 1] = offset + i, OPEN_SOURCE
+                    n_swings += 2
+                # (--) and candle2 opens above candle1's close: low at the close, high at the open
+                elif candle1_back == MINUS and open2_price > close1_price:
+                    swing_times[n_swings], swing_prices[n_swings], swing_types[n_swings] = close1_time, close1_price, LOW
+                    swing_times[n_swings + 1], swing_prices[n_swings + 1], swing_types[n_swings + 1] = open_times[i], open2_price, HIGH
+                    swing_bars[n_swings], swing_sources[n_swings] = close1_bar, CLOSE_SOURCE
+                    swing_bars[n_swings + 1], swing_sources[n_swings + 1] = offset + i, OPEN_SOURCE
+                    n_swings += 2
+            elif handler == REVERSAL:
+                # The pivot sits on whichever of candle1 close / candle2 open is more extreme
+                if candle1_back == PLUS:
+                    if close1_price >= open2_price:
+                        swing_times[n_swings], swing_prices[n_swings] = close1_time, close1_price
+                        swing_bars[n_swings], swing_sources[n_swings] = close1_bar, CLOSE_SOURCE
+                    else:
+                        swing_times[n_swings], swing_prices[n_swings] = open_times[i], open2_price
+                        swing_bars[n_swings], swing_sources[n_swings] = offset + i, OPEN_SOURCE
+                    swing_types[n_swings] = HIGH
+                else:
+                    if close1_price <= open2_price:
+                        swing_times[n_swings], swing_prices[n_swings] = close1_time, close1_price
+                        swing_bars[n_swings], swing_sources[n_swings] = close1_bar, CLOSE_SOURCE
+                    else:
+                        swing_times[n_swings], swing_prices[n_swings] = open_times[i], open2_price
+                        swing_bars[n_swings], swing_sources[n_swings] = offset + i, OPEN_SOURCE
+                    swing_types[n_swings] = LOW
+                n_swings += 1
+            else:
+                # A single event takes the connectors of the direction it moved in
+                if candle1_back == PLUS:
+                    if close1_price <= open2_price:
+                        candle2_back = PLUS
+                    else:
+                        candle2_back = MINUS
+                        swing_times[n_swings], swing_prices[n_swings], swing_types[n_swings] = close1_time, close1_price, HIGH
+                        swing_bars[n_swings], swing_sources[n_swings] = close1_bar, CLOSE_SOURCE
+                        n_swings += 1
+                else:
+                    if close1_price >= open2_price:
+                        candle2_back = MINUS
+                    else:
+                        candle2_back = PLUS
+                        swing_times[n_swings], swing_prices[n_swings], swing_types[n_swings] = close1_time, close1_price, LOW
+                        swing_bars[n_swings], swing_sources[n_swings] = close1_bar, CLOSE_SOURCE
+                        n_swings += 1
+
+            # Candles with wicks
+            for pivot_times, pivot_prices, swing_type, source in pivots[code]:
+                swing_times[n_swings], swing_prices[n_swings], swing_types[n_swings] = pivot_times[i], pivot_prices[i], swing_type
+                swing_bars[n_swings], swing_sources[n_swings] = offset + i, source
+                n_swings += 1
+
+            # Overwrite candle1 with candle2
+            candle1_back = candle2_back
+            close1_price = close_prices[i]
+            close1_time = close_times[i]
+            close1_bar = offset + i
+
+        self.candle1_back = candle1_back
+        self.candle1_close_price = close1_price
+        self.candle1_close_time = close1_time
+        self.candle1_bar = close1_bar
+        return (swing_times[:n_swings].copy(), swing_prices[:n_swings].copy(), swing_types[:n_swings].copy(),
+                swing_bars[:n_swings].copy(), swing_sources[:n_swings].copy())
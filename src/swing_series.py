@@ -0,0 +1,116 @@
+"""Time-indexed swing series.
+
+Swings are held as three parallel arrays sorted by time (int64 epoch ns,
+price, type code into ``SWING_TYPES``). Range and nearest-swing lookups are
+binary searches, slices are views, and the NumPy, pandas and Arrow exports
+wrap the same buffers without copying. Iterating yields the
+``{'time', 'price', 'type'}`` dicts that ``IntraBarZigzag.swings`` used to
+be a list of. pandas is only imported by the methods that return its
+objects, so the series can be used without it.
+"""
+from typing import Iterator
+
+import numpy as np
+
+from bar_aggregation import to_ns
+from swing_detection import SWING_TYPES
+
+
+class SwingSeries:
+    def __init__(self, times: np.ndarray, prices: np.ndarray, types: np.ndarray) -> None:
+        times = np.asarray(times, dtype=np.int64)
+        prices = np.asarray(prices)
+        types = np.asarray(types, dtype=np.int8)
+        if (times[1:] < times[:-1]).any():
+            order = np.argsort(times, kind='stable')
+            times, prices, types = times[order], prices[order], types[order]
+        self.times = times
+        self.prices = prices
+        self.types = types
+
+    @classmethod
+    def empty(cls) -> 'SwingSeries':
+        return cls(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int8))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __iter__(self) -> Iterator[dict]:
+        import pandas as pd
+
+        for time, price, swing_type in zip(pd.DatetimeIndex(self.times.view('datetime64[ns]')),
+                                           self.prices.tolist(), self.types.tolist()):
+            yield {'time': time, 'price': price, 'type': SWING_TYPES[swing_type]}
+
+    def __getitem__(self, key):
+        """A swing dict for an integer, a ``SwingSeries`` view for a slice."""
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise ValueError('SwingSeries slices must be contiguous')
+            return SwingSeries(self.times[key], self.prices[key], self.types[key])
+        return self._swing(range(len(self))[key])
+
+    def __repr__(self) -> str:
+        if not len(self):
+            return 'SwingSeries(0 swings)'
+        first, last = self.times[[0, -1]].view('datetime64[ns]')
+        return f'SwingSeries({len(self)} swings, {first} to {last})'
+
+    def between(self, start=None, end=None) -> 'SwingSeries':
+        """Swings with ``start <= time < end``, as a view."""
+        lo = 0 if start is None else np.searchsorted(self.times, to_ns(start), side='left')
+        hi = len(self) if end is None else np.searchsorted(self.times, to_ns(end), side='left')
+        return self[lo:max(lo, hi)]
+
+    def before(self, time):
+        """The last swing at or before ``time``, or None."""
+        i = np.searchsorted(self.times, to_ns(time), side='right') - 1
+        return self._swing(i) if i >= 0 else None
+
+    def after(self, time):
+        """The first swing at or after ``time``, or None."""
+        i = np.searchsorted(self.times, to_ns(time), side='left')
+        return self._swing(i) if i < len(self) else None
+
+    def legs(self) -> Iterator[tuple[dict, dict]]:
+        """Consecutive ``(start, end)`` swing pairs, i.e. every high-to-low and low-to-high leg."""
+        swings = iter(self)
+        previous = next(swings, None)
+        for swing in swings:
+            yield previous, swing
+            previous = swing
+
+    def to_numpy(self) -> dict:
+        """The ``time`` (int64 ns), ``price`` and ``type`` (codes into ``SWING_TYPES``) arrays themselves."""
+        return {'time': self.times, 'price': self.prices, 'type': self.types}
+
+    def to_pandas(self):
+        """A dataframe with columns ``time``, ``price`` and a categorical ``type``, over the same buffers."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'time': self.times.view('datetime64[ns]'),
+            'price': self.prices,
+            'type': pd.Categorical.from_codes(self.types, categories=SWING_TYPES),
+        }, copy=False)
+
+    def to_arrow(self):
+        """A ``pyarrow.RecordBatch`` over the same buffers; ``type`` is dictionary-encoded.
+
+        pyarrow is an optional dependency, only imported here.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as exc:
+            raise ImportError('SwingSeries.to_arrow needs pyarrow') from exc
+        return pa.RecordBatch.from_arrays([
+            pa.array(self.times.view('datetime64[ns]')),
+            pa.array(self.prices),
+            pa.DictionaryArray.from_arrays(pa.array(self.types), pa.array(SWING_TYPES)),
+        ], names=['time', 'price', 'type'])
+
+    def _swing(self, i: int) -> dict:
+        import pandas as pd
+
+        return {'time': pd.Timestamp(self.times[i]), 'price': self.prices[i].item(),
+                'type': SWING_TYPES[self.types[i]]}
@@ -0,0 +1,157 @@
+"""Fast loading of ``Time (EET),Ask,Bid,AskVolume,BidVolume`` tick exports.
+
+Columns are parsed with declared dtypes and the timestamp with its known
+format straight into int64 nanoseconds. The parsed arrays are saved as
+``.npy`` files in a sidecar directory next to the CSV, keyed by the CSV's size
+and mtime, so loading the same file again skips CSV parsing entirely.
+``start``/``end`` cut a ``[start, end)`` window out of the sorted ticks; on a
+memory-mapped cache hit only that window's pages are read. ``iter_tick_csv``
+parses files too large for memory a fixed number of rows at a time. pandas
+is only imported to parse a CSV or build a dataframe, so a cache hit never
+loads it.
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterator
+
+import numpy as np
+
+from bar_aggregation import to_ns
+
+TIME_COLUMN = 'Time (EET)'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+VALUE_COLUMNS = ('Ask', 'Bid', 'AskVolume', 'BidVolume')
+CACHE_SUFFIX = '.npycache'
+
+
+def load_tick_arrays(path: str, engine: str = 'c', cache: bool = True, mmap: bool = False,
+                     start=None, end=None) -> dict:
+    """Tick columns of a CSV export as time-sorted arrays; ``Time (EET)`` is int64 epoch ns.
+
+    ``engine`` is passed to ``pd.read_csv``; ``'pyarrow'`` parses with several
+    threads. With ``mmap`` a cache hit returns read-only memory-mapped arrays.
+    """
+    cache_dir = path + CACHE_SUFFIX
+    key = _source_key(path)
+    if cache:
+        arrays = _read_cache(cache_dir, key, mmap)
+        if arrays is not None:
+            return tick_window(arrays, start, end)
+
+    import pandas as pd
+
+    df = pd.read_csv(
+        path,
+        usecols=[TIME_COLUMN, *VALUE_COLUMNS],
+        dtype={TIME_COLUMN: str, **{col: np.float64 for col in VALUE_COLUMNS}},
+        engine=engine,
+    )
+    times = pd.to_datetime(df[TIME_COLUMN], format=TIME_FORMAT).to_numpy(dtype='datetime64[ns]')
+    arrays = {TIME_COLUMN: times.view(np.int64)}
+    for col in VALUE_COLUMNS:
+        arrays[col] = df[col].to_numpy(dtype=np.float64)
+    # Windows are cut by binary search, so the arrays (and the cache) are kept in time order
+    if (arrays[TIME_COLUMN][1:] < arrays[TIME_COLUMN][:-1]).any():
+        order = np.argsort(arrays[TIME_COLUMN], kind='stable')
+        arrays = {col: values[order] for col, values in arrays.items()}
+
+    if cache:
+        _write_cache(cache_dir, key, arrays)
+    return tick_window(arrays, start, end)
+
+
+def load_tick_csv(path: str, engine: str = 'c', cache: bool = True, start=None, end=None):
+    """Tick CSV as a dataframe with ``Time (EET)`` already parsed to datetime64[ns]."""
+    return tick_frame(load_tick_arrays(path, engine=engine, cache=cache, start=start, end=end))
+
+
+def iter_tick_csv(path: str, chunk_size: int = 1_000_000, columns: tuple = VALUE_COLUMNS,
+                  engine: str = 'c') -> Iterator[dict]:
+    """``load_tick_arrays``-style arrays of consecutive ``chunk_size``-row chunks of a CSV export.
+
+    Only ``Time (EET)`` and ``columns`` are parsed, and the cache is neither
+    read nor written, so memory depends on ``chunk_size`` alone.
+    """
+    import pandas as pd
+
+    columns = tuple(columns)
+    with pd.read_csv(
+        path,
+        usecols=[TIME_COLUMN, *columns],
+        dtype={TIME_COLUMN: str, **{col: np.float64 for col in columns}},
+        engine=engine,
+        chunksize=chunk_size,
+    ) as reader:
+        for df in reader:
+            times = pd.to_datetime(df[TIME_COLUMN], format=TIME_FORMAT).to_numpy(dtype='datetime64[ns]')
+            arrays = {TIME_COLUMN: times.view(np.int64)}
+            for col in columns:
+                arrays[col] = df[col].to_numpy(dtype=np.float64)
+            yield arrays
+
+
+def tick_frame(arrays: dict):
+    """Tick export dataframe over ``load_tick_arrays``-style arrays, without copying them."""
+    import pandas as pd
+
+    columns = {TIME_COLUMN: arrays[TIME_COLUMN].view('datetime64[ns]')}
+    for col in VALUE_COLUMNS:
+        if col in arrays:
+            columns[col] = arrays[col]
+    return pd.DataFrame(columns, copy=False)
+
+
+def tick_window(arrays: dict, start=None, end=None) -> dict:
+    """Views of the sorted tick arrays with ``start <= time < end``."""
+    if start is None and end is None:
+        return arrays
+    times = arrays[TIME_COLUMN]
+    lo = 0 if start is None else np.searchsorted(times, to_ns(start), side='left')
+    hi = len(times) if end is None else np.searchsorted(times, to_ns(end), side='left')
+    hi = max(lo, hi)
+    return {col: values[lo:hi] for col, values in arrays.items()}
+
+
+def clear_cache(path: str) -> None:
+    """Remove the binary sidecar of a CSV file, if there is one."""
+    shutil.rmtree(path + CACHE_SUFFIX, ignore_errors=True)
+
+
+def _source_key(path: str) -> dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _read_cache(cache_dir: str, key: dict, mmap: bool):
+    try:
+        with open(os.path.join(cache_dir, 'key.json')) as f:
+            if json.load(f) != key:
+                return None
+        return {col: np.load(os.path.join(cache_dir, _file_name(col)), mmap_mode='r' if mmap else None)
+                for col in (TIME_COLUMN, *VALUE_COLUMNS)}
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(cache_dir: str, key: dict, arrays: dict) -> None:
+    # Write next to the target and swap in, so readers never see a partial cache
+    parent = os.path.dirname(os.path.abspath(cache_dir))
+    try:
+        tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    except OSError:
+        return  # read-only location, just don't cache
+    try:
+        for col, values in arrays.items():
+            np.save(os.path.join(tmp_dir, _file_name(col)), values)
+        with open(os.path.join(tmp_dir, 'key.json'), 'w') as f:
+            json.dump(key, f)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, cache_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _file_name(col: str) -> str:
+    return ('time' if col == TIME_COLUMN else col) + '.npy'
@@ -0,0 +1,163 @@
+"""Local columnar tick store with a per-day time index.
+
+Every symbol gets a directory holding one raw little-endian file per
+column (``time`` as int64 epoch ns, then ``Ask``, ``Bid``, ``AskVolume``,
+``BidVolume`` as float64), appended to in time order, plus an
+``index.npy`` sidecar with the first row of every trading day. Columns are
+read through memory maps, so ``read`` returns zero-copy views of any
+``[start, end)`` window and only that window's pages are ever touched.
+Days are partitions of the index rather than separate files, so a window
+that spans days is still one contiguous view.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from bar_aggregation import NS_PER_DAY, to_ns
+from tick_loader import TIME_COLUMN, VALUE_COLUMNS, load_tick_arrays, tick_frame
+from zigzag_core import tick_arrays
+
+
+class TickStore:
+    def __init__(self, root: str) -> None:
+        self.root = os.path.expanduser(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def symbols(self) -> list:
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, 'meta.json')))
+
+    def write(self, symbol: str, ticks) -> int:
+        """Append ticks (a tick export dataframe or ``load_tick_arrays`` output) to ``symbol``.
+
+        Ticks must not be older than the last stored tick. Returns the number
+        of rows written.
+        """
+        arrays = _tick_columns(ticks)
+        times = arrays[TIME_COLUMN]
+        if len(times) == 0:
+            return 0
+
+        path = os.path.join(self.root, symbol)
+        os.makedirs(path, exist_ok=True)
+        meta = self._meta(symbol) or {'n_rows': 0, 'last_time': None}
+        if meta['last_time'] is not None and times[0] < meta['last_time']:
+            raise ValueError(f'ticks for {symbol} must not be older than the last stored tick')
+        day_starts, day_rows = self._index(symbol)
+
+        # Rows past n_rows are leftovers of an interrupted write
+        for col, values in arrays.items():
+            with open(os.path.join(path, _file_name(col)), 'r+b' if meta['n_rows'] else 'wb') as f:
+                f.truncate(meta['n_rows'] * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(values, dtype='<i8' if col == TIME_COLUMN else '<f8').tobytes())
+
+        # First row of every new day
+        days = times - times % NS_PER_DAY
+        new_day = np.flatnonzero(np.concatenate(([len(day_starts) == 0 or days[0] != day_starts[-1]],
+                                                 days[1:] != days[:-1])))
+        day_starts = np.concatenate((day_starts, days[new_day]))
+        day_rows = np.concatenate((day_rows, meta['n_rows'] + new_day))
+
+        # The index and meta go last, so readers only ever see complete rows
+        _atomic_save(os.path.join(path, 'index.npy'), lambda f: np.save(f, np.stack((day_starts, day_rows))))
+        meta = {'n_rows': meta['n_rows'] + len(times), 'last_time': int(times[-1]), 'columns': list(arrays)}
+        _atomic_save(os.path.join(path, 'meta.json'), lambda f: f.write(json.dumps(meta).encode()))
+        return len(times)
+
+    def import_csv(self, symbol: str, path: str) -> int:
+        """Append a tick CSV export to ``symbol``."""
+        return self.write(symbol, load_tick_arrays(path))
+
+    def days(self, symbol: str):
+        """Trading days stored for ``symbol``, as a DatetimeIndex."""
+        import pandas as pd
+
+        day_starts, _ = self._index(symbol)
+        return pd.DatetimeIndex(day_starts.view('datetime64[ns]'))
+
+    def read(self, symbol: str, start=None, end=None) -> dict:
+        """Zero-copy, read-only column arrays of the ticks with ``start <= time < end``.
+
+        Keys match ``load_tick_arrays``; ``Time (EET)`` is int64 epoch ns.
+        ``start`` and ``end`` take anything ``to_ns`` understands.
+        """
+        meta = self._meta(symbol)
+        if meta is None:
+            raise KeyError(symbol)
+        lo, hi = self.row_range(symbol, start, end)
+        path = os.path.join(self.root, symbol)
+        arrays = {}
+        for col in meta['columns']:
+            if meta['n_rows'] == 0:
+                arrays[col] = np.empty(0, dtype=np.int64 if col == TIME_COLUMN else np.float64)
+                continue
+            column = np.memmap(os.path.join(path, _file_name(col)), mode='r',
+                               dtype='<i8' if col == TIME_COLUMN else '<f8', shape=(meta['n_rows'],))
+            arrays[col] = column[lo:hi]
+        return arrays
+
+    def read_frame(self, symbol: str, start=None, end=None):
+        """``read`` as a tick export dataframe, still backed by the memory maps."""
+        return tick_frame(self.read(symbol, start, end))
+
+    def row_range(self, symbol: str, start=None, end=None) -> tuple[int, int]:
+        """Rows ``[lo, hi)`` of the ticks with ``start <= time < end``."""
+        meta = self._meta(symbol)
+        n_rows = meta['n_rows']
+        day_starts, day_rows = self._index(symbol)
+        bounds = np.append(day_rows, n_rows)
+        times = np.memmap(os.path.join(self.root, symbol, _file_name(TIME_COLUMN)), mode='r', dtype='<i8',
+                          shape=(n_rows,)) if n_rows else np.empty(0, dtype=np.int64)
+
+        def row(time, default):
+            if time is None:
+                return default
+            time = to_ns(time)
+            # Only the day holding ``time`` is searched
+            day = np.searchsorted(day_starts, time - time % NS_PER_DAY, side='left')
+            if day == len(day_starts) or day_starts[day] != time - time % NS_PER_DAY:
+                return int(bounds[day])
+            first, last = bounds[day], bounds[day + 1]
+            return int(first + np.searchsorted(times[first:last], time, side='left'))
+
+        lo, hi = row(start, 0), row(end, n_rows)
+        return lo, max(lo, hi)
+
+    def _meta(self, symbol: str):
+        try:
+            with open(os.path.join(self.root, symbol, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _index(self, symbol: str) -> tuple[np.ndarray, np.ndarray]:
+        try:
+            index = np.load(os.path.join(self.root, symbol, 'index.npy'))
+        except FileNotFoundError:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return index[0], index[1]
+
+
+def _tick_columns(ticks) -> dict:
+    # Time-sorted, like every appended batch must be
+    names = [col for col in VALUE_COLUMNS if col in (ticks if isinstance(ticks, dict) else ticks.columns)]
+    times, _, *values = tick_arrays(ticks, None, *names)
+    return {TIME_COLUMN: times, **dict(zip(names, values))}
+
+
+def _file_name(col: str) -> str:
+    return ('time' if col == TIME_COLUMN else col) + '.bin'
+
+
+def _atomic_save(path: str, write) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
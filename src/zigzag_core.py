@@ -0,0 +1,179 @@
+"""Pandas-free intra-bar zigzag pipeline.
+
+The engine behind ``IntraBarZigzag``, on plain arrays: ``build_bars``
+aggregates ticks into bars and their features, ``classify`` assigns candle
+types, ``weekend_mask`` finds the blank runs that ``_exclude_weekends`` drops
+and ``run_zigzag`` chains them with swing detection. Bars are dicts of arrays
+keyed like the ``resampled_df`` columns and swings a SwingSeries. Nothing here
+imports pandas, so short-lived workers start on NumPy alone;
+``IntraBarZigzag`` wraps these functions and builds its dataframes on top.
+"""
+import numpy as np
+
+from bar_aggregation import BAR_FEATURES, NS_PER_MINUTE, aggregate_bars, bar_features, sparse_time_bar_edges
+from bar_samplers import TimeBarSampler
+from candle_classification import classify_bars, mask_between_pivots
+from range_extremes import RangeExtremeIndex
+from swing_detection import SwingDetector
+from swing_series import SwingSeries
+from tick_loader import TIME_COLUMN
+
+
+def feature_names(features) -> tuple:
+    """Validated tuple of ``BAR_FEATURES`` names; ``True`` means all of them."""
+    features = tuple(BAR_FEATURES) if features is True else tuple(features or ())
+    unknown = set(features) - set(BAR_FEATURES)
+    if unknown:
+        raise ValueError(f'unknown bar features {sorted(unknown)}')
+    return features
+
+
+def tick_times(times) -> np.ndarray:
+    """int64 ns of tick times given as int64 ns, datetime64 or strings; only strings need pandas."""
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.integer):
+        return times.astype(np.int64, copy=False)
+    if not np.issubdtype(times.dtype, np.datetime64):
+        import pandas as pd
+
+        times = pd.to_datetime(times).to_numpy()
+    return times.astype('datetime64[ns]', copy=False).view(np.int64)
+
+
+def sort_order(times: np.ndarray):
+    """Stable time order of ``times``, or None when they are already sorted."""
+    if (times[1:] < times[:-1]).any():
+        return np.argsort(times, kind='stable')
+    return None
+
+
+def tick_arrays(ticks, prices=None, *columns) -> tuple:
+    """Time-sorted int64 ns times, float64 prices and float64 ``columns`` of some ticks.
+
+    ``ticks`` is a sequence of ``(time_ns, price)`` pairs, the times (as
+    ``tick_times`` takes them) with ``prices`` and any extra tick ``columns``,
+    e.g. volumes, passed alongside, or a tick table: ``load_tick_arrays``
+    arrays or a dataframe, with ``Time (EET)`` and ``Bid`` or formatted (a
+    time index and ``price``). For a table ``columns`` are column names, and
+    come back None where it lacks them. Ticks sharing a time keep their order.
+    """
+    if prices is None and (isinstance(ticks, dict) or hasattr(ticks, 'columns')):
+        names = ticks if isinstance(ticks, dict) else ticks.columns
+        prices = ticks['Bid' if 'Bid' in names else 'price']
+        columns = [ticks[name] if name in names else None for name in columns]
+        ticks = ticks[TIME_COLUMN] if TIME_COLUMN in names else ticks.index
+    if prices is None:
+        ticks = list(ticks)
+        times = np.fromiter((time for time, _ in ticks), dtype=np.int64, count=len(ticks))
+        prices = np.fromiter((price for _, price in ticks), dtype=np.float64, count=len(ticks))
+    else:
+        times = tick_times(ticks)
+        prices = np.asarray(prices, dtype=np.float64)
+    columns = [None if values is None else np.asarray(values, dtype=np.float64) for values in columns]
+    order = sort_order(times)
+    if order is not None:
+        times, prices = times[order], prices[order]
+        columns = [None if values is None else values[order] for values in columns]
+    return (times, prices, *columns)
+
+
+def build_bars(times: np.ndarray, prices: np.ndarray, labels: np.ndarray, starts: np.ndarray,
+               resample_frequency: int = None, index: RangeExtremeIndex = None, features: tuple = (),
+               bids: np.ndarray = None, asks: np.ndarray = None, volumes: np.ndarray = None) -> dict:
+    """``aggregate_bars`` of the ticks plus their ``features``.
+
+    Features are computed from ``bids`` when given (the exact Bid behind
+    rounded prices), else from ``prices``. Time bars (``resample_frequency``)
+    hold a bar's last tick until the bar ends.
+    """
+    bars = aggregate_bars(times, prices, starts, index)
+    if features:
+        bar_ends = None
+        if resample_frequency is not None:
+            bar_ends = labels + int(resample_frequency * NS_PER_MINUTE)
+        bars.update(bar_features(times, prices if bids is None else bids, starts, features, bars, asks=asks,
+                                 volumes=volumes, bar_ends=bar_ends))
+    return bars
+
+
+def classify(bars: dict) -> np.ndarray:
+    """Candle type codes of ``bars``; between pivots outside their formation are blanked in place."""
+    codes = classify_bars(bars)
+    # Between pivots are only kept for the formation they belong to
+    mask_between_pivots(bars, codes)
+    return codes
+
+
+def weekend_mask(open_price: np.ndarray, resample_frequency: int) -> tuple[np.ndarray, np.ndarray]:
+    """Bars to keep, and the run number of every blank bar (NaN for the others).
+
+    Blank runs longer than a day are weekends and are not kept. Runs are
+    numbered from 1 over blank and non-blank runs alike.
+    """
+    blank = np.isnan(open_price)
+    change = np.ones(len(blank), dtype=bool)
+    change[1:] = blank[1:] != blank[:-1]
+    runs = np.cumsum(change)
+    blank_lengths = np.bincount(runs[blank], minlength=len(blank) + 1)
+    weekend = blank & (blank_lengths[runs] > 1440 / resample_frequency)
+    return ~weekend, np.where(blank, runs, np.nan)
+
+
+def run_zigzag(ticks, prices=None, resample_frequency: int = None, bar_sampler=None, features=None,
+               asks=None, volumes=None, sparse: bool = False, candle_properties: dict = None,
+               connection_rules: dict = None) -> dict:
+    """Bars and swings of some ticks, as ``IntraBarZigzag`` sets up and detects them.
+
+    ``ticks``, ``prices``, ``asks`` and ``volumes`` are taken as by
+    ``tick_arrays``. Returns ``labels`` (int64 ns), ``bars`` (with
+    ``candle_type`` codes and the weekends of time bars left out), the
+    ``swings``, the ``bars`` row and ``SWING_SOURCES`` code of every swing
+    (``swing_bars``, ``swing_sources``) and the number of ``bars_removed``.
+    ``sparse`` time bars leave every empty bin out, like a sparse
+    ``IntraBarZigzag``, and describe them in ``gaps`` (``start``, ``end``,
+    ``length`` and ``weekend`` arrays).
+    """
+    if bar_sampler is None:
+        if resample_frequency is None:
+            raise ValueError('Pass a resample_frequency or a bar_sampler')
+        bar_sampler = TimeBarSampler(resample_frequency)
+    elif isinstance(bar_sampler, TimeBarSampler):
+        resample_frequency = bar_sampler.resample_frequency
+    if sparse and resample_frequency is None:
+        raise ValueError('sparse only applies to time bars')
+    features = feature_names(features)
+    times, prices, asks, volumes = tick_arrays(ticks, prices, asks, volumes)
+
+    gaps = None
+    if sparse:
+        labels, starts, gaps = sparse_time_bar_edges(times, resample_frequency)
+    else:
+        labels, starts = bar_sampler.edges(times, prices, volumes)
+    bars = build_bars(times, prices, labels, starts, resample_frequency, features=features, asks=asks,
+                      volumes=volumes)
+    bars['candle_type'] = classify(bars)
+    bars_removed = 0
+    if gaps is not None:
+        # The empty bins were never built, only the gap table is marked
+        gaps['weekend'] = gaps['length'] > 1440 / resample_frequency
+        bars_removed = int(gaps['length'][gaps['weekend']].sum())
+    elif resample_frequency is not None:
+        keep, _ = weekend_mask(bars['open_price'], resample_frequency)
+        bars_removed = int(len(keep) - keep.sum())
+        if bars_removed:
+            labels = labels[keep]
+            bars = {col: values[keep] for col, values in bars.items()}
+
+    detector = SwingDetector(candle_properties, connection_rules)
+    swing_times, swing_prices, swing_types = detector.run(bars['candle_type'], bars)
+    result = {
+        'labels': labels,
+        'bars': bars,
+        'swings': SwingSeries(swing_times, swing_prices, swing_types),
+        'swing_bars': detector.swing_bars,
+        'swing_sources': detector.swing_sources,
+        'bars_removed': bars_removed,
+    }
+    if gaps is not None:
+        result['gaps'] = gaps
+    return result
@@ -0,0 +1,59 @@
+"""Shared fixtures: seeded synthetic ticks with weekend gaps, duplicate timestamps and price ties, and the
+bars and swings of the original implementation frozen in ``data/baseline_sample.npz``."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'benchmarks')]
+
+from synthetic_ticks import TICK_SIZE, synthetic_ticks  # noqa: E402
+
+FREQUENCIES = (1, 5, 60)
+# Frequencies frozen by data/freeze_baseline.py
+BASELINE_FREQUENCIES = (1, 5, 15)
+
+
+@pytest.fixture(scope='session')
+def ticks():
+    """Eight days of ticks across a weekend; every 7th tick is repeated at the same time one tick lower."""
+    df = synthetic_ticks(40_000, seed=3, busy_rate=0.2, quiet_rate=0.01)
+    repeats = df.iloc[::7].copy()
+    repeats['Bid'] = np.round(repeats['Bid'] - TICK_SIZE, 3)
+    repeats['Ask'] = np.round(repeats['Ask'] - TICK_SIZE, 3)
+    # The repeat sorts right after its original
+    df = df.assign(order=np.arange(len(df)) * 2)
+    repeats = repeats.assign(order=np.arange(0, len(df), 7) * 2 + 1)
+    df = pd.concat([df, repeats]).sort_values('order', kind='stable')
+    return df.drop(columns='order').reset_index(drop=True)
+
+
+@pytest.fixture(scope='session')
+def dense_runs(ticks):
+    """The in-memory dense IntraBarZigzag every other path is checked against, per frequency."""
+    from intra_bar_zigzag import IntraBarZigzag
+
+    runs = {}
+    for freq in FREQUENCIES:
+        zigzag = IntraBarZigzag(ticks, freq)
+        zigzag.runSetup()
+        zigzag.runDetection()
+        runs[freq] = zigzag
+    return runs
+
+
+@pytest.fixture(scope='session')
+def sample_ticks():
+    df = pd.read_csv(os.path.join(ROOT, 'data', 'sample_tick_data.csv'), index_col=0)
+    df['Time (EET)'] = pd.to_datetime(df['Time (EET)'])
+    return df
+
+
+@pytest.fixture(scope='session')
+def baseline():
+    """Frozen arrays of the original implementation, keyed ``'<freq>/<column>'``."""
+    with np.load(os.path.join(ROOT, 'tests', 'data', 'baseline_sample.npz')) as arrays:
+        return dict(arrays)
@@ -0,0 +1,51 @@
+"""Freeze the bars and swings of the original resample().apply / iterrows IntraBarZigzag.
+
+Writes ``baseline_sample.npz`` next to this file from ``data/sample_tick_data.csv``
+at every frequency in ``FREQUENCIES``. The original implementation is the
+``src/intra_bar_zigzag.py`` of the repository's first commit; put that file in
+a directory and pass the directory:
+
+    python tests/data/freeze_baseline.py <directory of the original intra_bar_zigzag.py>
+"""
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+FREQUENCIES = (1, 5, 15)
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def freeze(baseline_dir: str) -> dict:
+    sys.path.insert(0, baseline_dir)
+    from intra_bar_zigzag import IntraBarZigzag
+
+    df = pd.read_csv(os.path.join(HERE, '..', '..', 'data', 'sample_tick_data.csv'), index_col=0)
+    df['Time (EET)'] = pd.to_datetime(df['Time (EET)'])
+    arrays = {}
+    for freq in FREQUENCIES:
+        zigzag = IntraBarZigzag(df, freq)
+        with contextlib.redirect_stdout(io.StringIO()):
+            zigzag.runSetup()
+            zigzag.runDetection()
+        bars = zigzag.resampled_df.drop(columns='nat_group')
+        arrays[f'{freq}/time'] = bars.index.to_numpy(dtype='datetime64[ns]')
+        for col in bars.columns:
+            if col == 'candle_type':
+                arrays[f'{freq}/{col}'] = bars[col].to_numpy(dtype=str)
+            elif col.endswith('_time'):
+                arrays[f'{freq}/{col}'] = pd.to_datetime(bars[col]).to_numpy(dtype='datetime64[ns]')
+            else:
+                arrays[f'{freq}/{col}'] = bars[col].to_numpy(dtype=np.float64)
+        swings = pd.DataFrame(zigzag.swings, columns=['time', 'price', 'type'])
+        arrays[f'{freq}/swing_time'] = pd.to_datetime(swings['time']).to_numpy(dtype='datetime64[ns]')
+        arrays[f'{freq}/swing_price'] = swings['price'].to_numpy(dtype=np.float64)
+        arrays[f'{freq}/swing_type'] = swings['type'].to_numpy(dtype=str)
+    return arrays
+
+
+if __name__ == '__main__':
+    np.savez_compressed(os.path.join(HERE, 'baseline_sample.npz'), **freeze(sys.argv[1]))
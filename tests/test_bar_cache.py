@@ -0,0 +1,37 @@
+"""BarCache keys must change with every input the cached bars depend on, and a hit must report what a run does."""
+import pytest
+
+from bar_cache import BarCache
+from intra_bar_zigzag import IntraBarZigzag
+
+
+@pytest.mark.parametrize('feature, column, compact', [
+    ('spread', 'Ask', False),
+    ('volume', 'AskVolume', False),
+    ('spread', 'Bid', True),
+])
+def test_feature_input_change_misses(ticks, tmp_path, feature, column, compact):
+    cache = BarCache(str(tmp_path))
+    ticks = ticks.iloc[:5_000]
+    assert not cache.run(IntraBarZigzag(ticks, 5, features=(feature,), compact=compact))
+    assert cache.run(IntraBarZigzag(ticks, 5, features=(feature,), compact=compact))
+
+    # Too small to change the float32 compact prices, so only the feature input differs
+    changed = ticks.assign(**{column: ticks[column] + 1e-9})
+    zigzag = IntraBarZigzag(changed, 5, features=(feature,), compact=compact)
+    assert not cache.run(zigzag)
+    fresh = IntraBarZigzag(changed, 5, features=(feature,), compact=compact)
+    fresh.runSetup()
+    assert zigzag.resampled_df[feature].equals(fresh.resampled_df[feature])
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_hit_reports_the_metrics_of_a_run(ticks, tmp_path, sparse):
+    cache = BarCache(str(tmp_path))
+    miss = IntraBarZigzag(ticks, 1, sparse=sparse)
+    assert not cache.run(miss)
+    hit = IntraBarZigzag(ticks, 1, sparse=sparse)
+    assert cache.run(hit)
+    assert miss.metrics['bars_removed'] > 0
+    assert {key: value for key, value in hit.metrics.items() if key not in ('timings', 'cache')} == \
+        {key: value for key, value in miss.metrics.items() if key not in ('timings', 'cache')}
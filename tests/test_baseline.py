@@ -0,0 +1,164 @@
+"""The vectorised pipeline against the original resample().apply / iterrows implementation."""
+import itertools
+
+import numpy as np
+import pytest
+
+from bar_aggregation import BAR_COLUMNS
+from candle_classification import CANDLE_TYPE_CODES, CANDLE_TYPES, classify_candles
+from conftest import BASELINE_FREQUENCIES
+from intra_bar_zigzag import IntraBarZigzag
+from swing_detection import SWING_TYPES, SwingDetector
+
+# The original refinement returns these before resetting its between pivots, so it
+# leaves the previous bar's in their row
+EARLY_RETURN = ('Bullish_LH_NoWick', 'Bearish_HL_NoWick', 'Doji_HL_BottomWick', 'Doji_LH_TopWick', 'Single_Event')
+
+
+@pytest.mark.parametrize('freq', BASELINE_FREQUENCIES)
+def test_bars(sample_ticks, baseline, freq):
+    zigzag = IntraBarZigzag(sample_ticks, freq)
+    zigzag.runSetup()
+    df = zigzag.resampled_df
+    np.testing.assert_array_equal(df.index.to_numpy(), baseline[f'{freq}/time'])
+    candle_types = baseline[f'{freq}/candle_type']
+    np.testing.assert_array_equal(df['candle_type'].to_numpy(dtype=str), candle_types)
+    stale = np.isin(candle_types, EARLY_RETURN)
+    for col in BAR_COLUMNS:
+        if col == 'candle_type':
+            continue
+        expected = baseline[f'{freq}/{col}']
+        actual = df[col].to_numpy(dtype=expected.dtype)
+        if 'between' in col:
+            expected, actual = expected[~stale], actual[~stale]
+        np.testing.assert_array_equal(actual, expected, err_msg=col)
+
+
+def baseline_swings(baseline, freq) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    types = np.array([SWING_TYPES.index(swing_type) for swing_type in baseline[f'{freq}/swing_type']])
+    return baseline[f'{freq}/swing_time'].view(np.int64), baseline[f'{freq}/swing_price'], types
+
+
+@pytest.mark.parametrize('freq', BASELINE_FREQUENCIES)
+def test_state_machine_over_baseline_bars(baseline, freq):
+    codes = np.array([CANDLE_TYPE_CODES[name] for name in baseline[f'{freq}/candle_type']])
+    bars = {col: baseline[f'{freq}/{col}'] for col in BAR_COLUMNS if col != 'candle_type'}
+    bars = {col: values.view(np.int64) if col.endswith('_time') else values for col, values in bars.items()}
+    swings = SwingDetector().run(codes, bars)
+    for actual, expected in zip(swings, baseline_swings(baseline, freq)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize('freq', BASELINE_FREQUENCIES)
+def test_swings(sample_ticks, baseline, freq):
+    zigzag = IntraBarZigzag(sample_ticks, freq)
+    zigzag.runSetup()
+    zigzag.runDetection()
+    for actual, expected in zip((zigzag.swing_times, zigzag.swing_prices, zigzag.swing_types),
+                                baseline_swings(baseline, freq)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def original_initial_type(o, h, l, c, high_time, low_time) -> str:
+    """The original ``_initial_candle_classification`` chain."""
+    if c > o:
+        if low_time < high_time:
+            if h > c and l < o:
+                return 'Bullish_LH_FullWick'
+            elif h > c and l == o:
+                return 'Bullish_LH_TopWick'
+            elif h == c and l < o:
+                return 'Bullish_LH_BottomWick'
+            elif h == c and l == o:
+                return 'Bullish_LH_NoWick'
+            return '__bullish_LH_UNKNOWN'
+        elif high_time < low_time:
+            if h > c and l < o:
+                return 'Bullish_HL_FullWick'
+            elif h == c and l < o:
+                return 'Bullish_HL_BottomWick'
+            return '__bullish_HL_UNKNOWN'
+        return '__bullish_UNKNOWN'
+    elif c < o:
+        if high_time < low_time:
+            if h > o and l < c:
+                return 'Bearish_HL_FullWick'
+            elif h == o and l < c:
+                return 'Bearish_HL_BottomWick'
+            elif h > o and l == c:
+                return 'Bearish_HL_TopWick'
+            elif h == o and l == c:
+                return 'Bearish_HL_NoWick'
+            return '__bearish_HL_UNKNOWN'
+        elif low_time < high_time:
+            if h > o and l < c:
+                return 'Bearish_LH_FullWick'
+            elif h > o and l == c:
+                return 'Bearish_LH_TopWick'
+            return '__bearish_LH_UNKNOWN'
+        return '__bearish_UNKNOWN'
+    if high_time < low_time:
+        if h > o and l < c:
+            return 'Doji_HL_FullWick'
+        elif h == o and l < c:
+            return 'Doji_HL_BottomWick'
+        return 'doji_HL_UNKNOWN'
+    elif low_time < high_time:
+        if h > o and l < c:
+            return 'Doji_LH_FullWick'
+        elif h > o and l == c:
+            return 'Doji_LH_TopWick'
+        return 'doji_LH_UNKNOWN'
+    return 'Single_Event'
+
+
+def original_refined_type(candle_type, o, c, high_open_low, low_high_close, low_open_high, high_low_close) -> str:
+    """The original ``_refined_candle_classification`` chain; it fell through to None for unknown types."""
+    lh_flags = {
+        'Bullish_LH_FullWick': (True, True), 'Bullish_LH_TopWick': (False, True),
+        'Bullish_LH_BottomWick': (True, False), 'Bearish_LH_FullWick': (True, True),
+        'Bearish_LH_TopWick': (True, False), 'Doji_LH_FullWick': (True, True),
+    }
+    hl_flags = {
+        'Bearish_HL_FullWick': (True, True), 'Bearish_HL_BottomWick': (False, True),
+        'Bearish_HL_TopWick': (True, False), 'Bullish_HL_FullWick': (True, True),
+        'Bullish_HL_BottomWick': (True, False), 'Doji_HL_FullWick': (True, True),
+    }
+    if candle_type in lh_flags:
+        uses1, uses2 = lh_flags[candle_type]
+        flag1, flag2 = uses1 and high_open_low > o, uses2 and low_high_close < c
+        suffixes = ('_OpenUpDownToLow', '_PostHighDipBelowClose')
+    elif candle_type in hl_flags:
+        uses1, uses2 = hl_flags[candle_type]
+        flag1, flag2 = uses1 and low_open_high < o, uses2 and high_low_close > c
+        suffixes = ('_OpenDownThenUpToHigh', '_PostLowRallyAboveClose')
+    elif candle_type in EARLY_RETURN:
+        return candle_type
+    else:
+        return None
+    return candle_type + (suffixes[0] if flag1 else '') + (suffixes[1] if flag2 else '')
+
+
+def test_lookup_table_against_original_chains():
+    # One bar per comparison key: body, high/low order, top wick, bottom wick and both formation flags
+    keys = list(itertools.product((101.0, 99.0, 100.0), ((1, 2), (2, 1), (1, 1)), (False, True), (False, True),
+                                  (False, True), (False, True)))
+    assert len(keys) == 144
+    bars = {name: np.empty(len(keys)) for name in ('o', 'h', 'l', 'c', 'hol', 'lhc', 'loh', 'hlc')}
+    bars['low_time'], bars['high_time'] = np.empty(len(keys), dtype=np.int64), np.empty(len(keys), dtype=np.int64)
+    expected = []
+    for i, (c, (low_time, high_time), top, bottom, flag1, flag2) in enumerate(keys):
+        o = 100.0
+        h, l = max(o, c) + top, min(o, c) - bottom
+        hol, lhc, loh, hlc = o + 0.5 * flag1, c - 0.5 * flag2, o - 0.5 * flag1, c + 0.5 * flag2
+        for name, value in zip(('o', 'h', 'l', 'c', 'hol', 'lhc', 'loh', 'hlc'), (o, h, l, c, hol, lhc, loh, hlc)):
+            bars[name][i] = value
+        bars['low_time'][i], bars['high_time'][i] = low_time, high_time
+        initial = original_initial_type(o, h, l, c, high_time, low_time)
+        expected.append(original_refined_type(initial, o, c, hol, lhc, loh, hlc) or initial)
+
+    codes = classify_candles(bars['o'], bars['h'], bars['l'], bars['c'], bars['high_time'], bars['low_time'],
+                             bars['hol'], bars['lhc'], bars['loh'], bars['hlc'])
+    assert [CANDLE_TYPES[code] for code in codes] == expected
+    # Every candle type is reached but blank and the unknowns of the two formations that allow every wick
+    assert set(expected) == set(CANDLE_TYPE_CODES) - {'blank', '__bullish_LH_UNKNOWN', '__bearish_HL_UNKNOWN'}
@@ -0,0 +1,36 @@
+"""Swing-preserving decimation stays within its point budget."""
+import numpy as np
+import pytest
+
+from chart_decimation import DecimationPyramid, anchor_indices
+
+
+@pytest.fixture(scope='module')
+def tick_arrays(ticks):
+    return ticks['Time (EET)'].to_numpy(dtype='datetime64[ns]').view(np.int64), ticks['Bid'].to_numpy()
+
+
+@pytest.mark.parametrize('bar_extremes', [False, True])
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_query_stays_near_the_budget(tick_arrays, dense_runs, bar_extremes, method):
+    times, prices = tick_arrays
+    keep = anchor_indices(dense_runs[1], times, prices, bar_extremes)
+    # More anchors than the budget
+    assert len(keep) > 4_000
+    pyramid = DecimationPyramid(times, prices, keep=keep)
+    shown = pyramid.query(n_points=4_000, method=method)
+    # Decimated ticks often coincide with the thinned anchors, so the budget is an upper bound
+    assert 1_000 <= len(shown) <= 4_100
+    assert np.all(np.diff(shown) > 0)
+
+
+def test_zoomed_window_keeps_every_anchor(tick_arrays, dense_runs):
+    times, prices = tick_arrays
+    keep = anchor_indices(dense_runs[1], times, prices)
+    pyramid = DecimationPyramid(times, prices, keep=keep)
+    # A window holding fewer anchors than half the budget
+    start, end = times[keep[1_000]], times[keep[2_500]]
+    shown = pyramid.query(start, end, n_points=4_000)
+    window = keep[(times[keep] >= start) & (times[keep] < end)]
+    assert np.isin(window, shown).all()
+    assert len(shown) <= 4_100
@@ -0,0 +1,365 @@
+"""Every alternative pipeline path against the dense in-memory IntraBarZigzag run."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import swing_detection
+from bar_aggregation import BAR_COLUMNS
+from conftest import FREQUENCIES
+from swing_detection import SwingDetector
+
+
+def bar_arrays(resampled_df) -> tuple[np.ndarray, dict]:
+    """Candle type codes and int64 ns / float64 bar columns of a ``resampled_df``."""
+    codes = resampled_df['candle_type'].cat.codes.to_numpy()
+    bars = {}
+    for col in BAR_COLUMNS:
+        if col.endswith('_price'):
+            bars[col] = resampled_df[col].to_numpy(dtype=np.float64)
+        elif col.endswith('_time'):
+            bars[col] = resampled_df[col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return codes, bars
+
+
+def tick_columns(ticks) -> tuple[np.ndarray, np.ndarray]:
+    times = ticks['Time (EET)'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    return times, ticks['Bid'].to_numpy(dtype=np.float64)
+
+
+def assert_same_swings(times, prices, types, zigzag) -> None:
+    np.testing.assert_array_equal(times, zigzag.swing_times)
+    np.testing.assert_array_equal(prices, zigzag.swing_prices)
+    np.testing.assert_array_equal(types, zigzag.swing_types)
+
+
+def test_dense_fixture_has_ties_duplicates_and_weekends(ticks, dense_runs):
+    assert ticks['Time (EET)'].duplicated().any()
+    assert ticks['Time (EET)'].diff().max().days >= 2
+    assert dense_runs[1].metrics['bars_removed'] > 0
+    assert all(len(zigzag.swings) for zigzag in dense_runs.values())
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+def test_state_machine_in_pieces(dense_runs, freq, monkeypatch):
+    # Bars fed in uneven pieces, each run split into tiny internal chunks, with candle1 carried over
+    monkeypatch.setattr(swing_detection, 'RUN_CHUNK', 7)
+    codes, bars = bar_arrays(dense_runs[freq].resampled_df)
+    detector = SwingDetector()
+    cuts = np.linspace(0, len(codes), 6).astype(int)
+    pieces = [detector.run(codes[lo:hi], {col: values[lo:hi] for col, values in bars.items()})
+              for lo, hi in zip(cuts[:-1], cuts[1:])]
+    assert_same_swings(*(np.concatenate(columns) for columns in zip(*pieces)), dense_runs[freq])
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+def test_streaming(ticks, dense_runs, freq):
+    from streaming import StreamingIntraBarZigzag
+
+    times, prices = tick_columns(ticks)
+    swings = list(StreamingIntraBarZigzag(freq).run(zip(times.tolist(), prices.tolist())))
+    assert_same_swings(np.array([swing['time'] for swing in swings], dtype='datetime64[ns]').view(np.int64),
+                       np.array([swing['price'] for swing in swings]),
+                       np.array([swing_detection.SWING_TYPES.index(swing['type']) for swing in swings]),
+                       dense_runs[freq])
+
+
+def test_live_feed_drops_a_late_tick(ticks, dense_runs, tmp_path):
+    import asyncio
+
+    from live_feed import LiveIntraBarZigzag, read_socket, serve_csv
+    from tick_loader import TIME_COLUMN, TIME_FORMAT
+
+    # One tick sent out of order, a thousand ticks late
+    late = ticks.iloc[[19_000]].assign(Bid=139.0)
+    sent = pd.concat([ticks.iloc[:20_000], late, ticks.iloc[20_000:]])
+    path = tmp_path / 'ticks.csv'
+    sent.assign(**{TIME_COLUMN: sent[TIME_COLUMN].dt.strftime(TIME_FORMAT)}).to_csv(path, index=False)
+
+    async def main():
+        # A small queue, so the source waits on the consumer
+        live = LiveIntraBarZigzag(5, max_queue=64)
+        server = await serve_csv(str(path))
+        async with server:
+            await asyncio.wait_for(live.run(read_socket(live, '127.0.0.1', server.sockets[0].getsockname()[1])), 60)
+        return live
+
+    live = asyncio.run(main())
+    assert live.stats['dropped_ticks'] == 1
+    assert live.stats['ticks'] == len(ticks)
+    assert_same_swings(np.array([swing['time'] for swing in live.swings], dtype='datetime64[ns]').view(np.int64),
+                       np.array([swing['price'] for swing in live.swings]),
+                       np.array([swing_detection.SWING_TYPES.index(swing['type']) for swing in live.swings]),
+                       dense_runs[5])
+
+
+def threshold_loop(amounts, threshold: float) -> np.ndarray:
+    """Bar starts of a sampler that closes a bar on every tick that takes the running total past a multiple."""
+    starts, total, crossing = [0], 0.0, threshold
+    for i, amount in enumerate(amounts):
+        total += amount
+        if total >= crossing:
+            while total >= crossing:
+                crossing += threshold
+            starts.append(i + 1)
+    return np.array([start for start in starts if start < len(amounts)])
+
+
+@pytest.mark.parametrize('sampler', ['tick', 'volume', 'dollar'])
+def test_event_samplers(ticks, sampler):
+    from bar_samplers import DollarBarSampler, TickBarSampler, VolumeBarSampler
+    from intra_bar_zigzag import IntraBarZigzag
+
+    times, prices = tick_columns(ticks)
+    volumes = (ticks['AskVolume'] + ticks['BidVolume']).to_numpy()
+    # A tick carries up to 4.5 volume, so the volume and dollar bars see ticks crossing several multiples
+    bar_sampler, amounts, threshold = {
+        'tick': (TickBarSampler(50), np.ones(len(times)), 50),
+        'volume': (VolumeBarSampler(3.0), volumes, 3.0),
+        'dollar': (DollarBarSampler(420.0), prices * volumes, 420.0),
+    }[sampler]
+    starts = threshold_loop(amounts, threshold)
+
+    labels, sampled = bar_sampler.edges(times, prices, volumes)
+    np.testing.assert_array_equal(sampled, starts)
+    np.testing.assert_array_equal(labels, times[starts])
+    zigzag = IntraBarZigzag(ticks, bar_sampler=bar_sampler)
+    zigzag.runSetup()
+    np.testing.assert_array_equal(zigzag.resampled_df['close_time'].to_numpy(dtype='datetime64[ns]').view(np.int64),
+                                  times[np.append(starts[1:], len(times)) - 1])
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 64, 256])
+@pytest.mark.parametrize('scaled', [False, True])
+def test_range_extreme_index(ticks, block_size, scaled, monkeypatch):
+    import range_extremes
+
+    # Tables built in several chunks; prices on a 0.001 grid, so ranges often hold tied extremes
+    monkeypatch.setattr(range_extremes, 'BUILD_CHUNK', 5_000)
+    _, prices = tick_columns(ticks)
+    values = np.rint(prices * 1000).astype(np.int32) if scaled else prices
+    index = range_extremes.RangeExtremeIndex(values, block_size=block_size)
+    rng = np.random.default_rng(block_size)
+    starts = rng.integers(0, len(values), 2_000)
+    # Ranges inside one block, across a few blocks and across many
+    lengths = np.concatenate([rng.integers(1, 2 * block_size + 2, 1_000), rng.integers(1, 20_000, 1_000)])
+    stops = np.minimum(starts + lengths, len(values))
+    for kind, reduce in (('argmax', np.argmax), ('argmin', np.argmin)):
+        expected = [start + reduce(values[start:stop]) for start, stop in zip(starts, stops)]
+        np.testing.assert_array_equal(getattr(index, kind)(starts, stops), expected)
+        assert getattr(index, kind)(starts[0], stops[0]) == expected[0]
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_loaded_window_of_an_unsorted_export(ticks, tmp_path, mmap):
+    from tick_loader import TIME_COLUMN, TIME_FORMAT, load_tick_arrays
+
+    # Days written in reverse order
+    days = ticks[TIME_COLUMN].dt.floor('D')
+    shuffled = pd.concat([ticks[days == day] for day in days.unique()[::-1]])
+    path = tmp_path / 'ticks.csv'
+    shuffled.assign(**{TIME_COLUMN: shuffled[TIME_COLUMN].dt.strftime(TIME_FORMAT)}).to_csv(path, index=False)
+    file_times, _ = tick_columns(shuffled)
+    order = np.argsort(file_times, kind='stable')
+    start, end = file_times[order][[1_000, 30_000]]
+
+    load_tick_arrays(str(path))
+    arrays = load_tick_arrays(str(path), mmap=mmap, start=start, end=end)
+    window = (file_times[order] >= start) & (file_times[order] < end)
+    np.testing.assert_array_equal(arrays[TIME_COLUMN], file_times[order][window])
+    np.testing.assert_array_equal(arrays['Bid'], shuffled['Bid'].to_numpy()[order][window])
+
+
+def test_multi_timeframe(ticks, dense_runs):
+    from intra_bar_zigzag import IntraBarZigzag
+
+    # 14 is coarsened from 7 and 60 from 5; 7 divides neither 5 nor 60
+    frames = IntraBarZigzag.runMultiTimeframe(ticks, [1, 5, 7, 14, 60])
+    for freq, zigzag in frames.items():
+        dense = dense_runs.get(freq)
+        if dense is None:
+            dense = IntraBarZigzag(ticks, freq)
+            dense.runSetup()
+            dense.runDetection()
+        pd.testing.assert_frame_equal(zigzag.resampled_df, dense.resampled_df)
+        assert_same_swings(zigzag.swing_times, zigzag.swing_prices, zigzag.swing_types, dense)
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+def test_parallel(ticks, dense_runs, freq):
+    from parallel_detection import run_parallel
+
+    zigzag = run_parallel(ticks, freq, max_workers=2)
+    pd.testing.assert_frame_equal(zigzag.resampled_df, dense_runs[freq].resampled_df)
+    assert_same_swings(zigzag.swing_times, zigzag.swing_prices, zigzag.swing_types, dense_runs[freq])
+    np.testing.assert_array_equal(zigzag.swing_bars, dense_runs[freq].swing_bars)
+    np.testing.assert_array_equal(zigzag.swing_sources, dense_runs[freq].swing_sources)
+
+
+def test_parallel_metrics(ticks, dense_runs):
+    from parallel_detection import run_parallel
+
+    zigzag = run_parallel(ticks, 1, max_workers=2)
+    serial = dense_runs[1].metrics
+    assert zigzag.metrics['timings'].keys() == serial['timings'].keys()
+    assert {key: value for key, value in zigzag.metrics.items() if key not in ('timings', 'worker_timings')} == \
+        {key: value for key, value in serial.items() if key != 'timings'}
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+def test_sparse(ticks, dense_runs, freq):
+    from intra_bar_zigzag import IntraBarZigzag
+
+    zigzag = IntraBarZigzag(ticks, freq, sparse=True)
+    zigzag.runSetup()
+    zigzag.runDetection()
+    dense = dense_runs[freq]
+    pd.testing.assert_frame_equal(zigzag.dense_resampled_df(), dense.resampled_df.drop(columns='nat_group'))
+    assert_same_swings(zigzag.swing_times, zigzag.swing_prices, zigzag.swing_types, dense)
+    assert {key: value for key, value in zigzag.metrics.items() if key != 'timings'} == \
+        {key: value for key, value in dense.metrics.items() if key != 'timings'}
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+@pytest.mark.parametrize('price_scale', [None, 1000])
+def test_compact(ticks, dense_runs, freq, price_scale):
+    from intra_bar_zigzag import IntraBarZigzag
+
+    zigzag = IntraBarZigzag(ticks, freq, compact=True, price_scale=price_scale)
+    zigzag.runSetup()
+    zigzag.runDetection()
+    dense = dense_runs[freq]
+    # float32 prices keep every 0.001 step of the fixture apart, and scaled prices divide back exactly
+    dtype = np.float32 if price_scale is None else np.float64
+    pd.testing.assert_frame_equal(zigzag.resampled_df, dense.resampled_df.astype(
+        {col: dtype for col in dense.resampled_df.columns if col.endswith('_price')}))
+    np.testing.assert_array_equal(zigzag.swing_times, dense.swing_times)
+    np.testing.assert_array_equal(zigzag.swing_prices, dense.swing_prices.astype(dtype))
+    np.testing.assert_array_equal(zigzag.swing_types, dense.swing_types)
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+def test_incremental_with_checkpoints(ticks, dense_runs, freq):
+    import json
+
+    from incremental import IncrementalIntraBarZigzag
+
+    # Random cuts plus cuts between ticks that share a timestamp
+    times, _ = tick_columns(ticks)
+    rng = np.random.default_rng(freq)
+    duplicates = np.flatnonzero(times[1:] == times[:-1]) + 1
+    cuts = np.unique(np.concatenate((rng.choice(np.arange(1, len(ticks)), 15, replace=False),
+                                     rng.choice(duplicates, 5, replace=False))))
+    zigzag = IncrementalIntraBarZigzag(freq)
+    bars, swings = [], []
+    for rows in np.split(np.arange(len(ticks)), cuts):
+        new_bars, new_swings = zigzag.append(ticks.iloc[rows])
+        bars.append(new_bars)
+        swings.append(new_swings)
+        zigzag = IncrementalIntraBarZigzag.from_checkpoint(json.loads(json.dumps(zigzag.checkpoint())))
+    new_bars, new_swings = zigzag.pending()
+    bars = pd.concat([*bars, new_bars])
+    swings = pd.concat([*swings, new_swings])
+
+    pd.testing.assert_frame_equal(bars, dense_runs[freq].resampled_df.drop(columns='nat_group'))
+    assert_same_swings(swings['time'].to_numpy(dtype='datetime64[ns]').view(np.int64), swings['price'].to_numpy(),
+                       swings['type'].map(swing_detection.SWING_TYPES.index).to_numpy(), dense_runs[freq])
+
+
+def test_tick_store_windows(ticks, tmp_path):
+    from tick_loader import TIME_COLUMN
+    from tick_store import TickStore
+
+    store = TickStore(str(tmp_path))
+    half = len(ticks) // 2
+    store.write('USDJPY', ticks.iloc[:half])
+    store.write('USDJPY', ticks.iloc[half:])
+    times, prices = tick_columns(ticks)
+    rng = np.random.default_rng(0)
+    # Bounds on tick times, between them, on day boundaries, outside the data and open-ended
+    bounds = np.concatenate((rng.choice(times, 20), rng.integers(times[0], times[-1], 20),
+                             np.unique(times - times % 86_400_000_000_000), [times[0] - 1, times[-1] + 1]))
+    windows = [(None, None), (None, int(bounds[3])), (int(bounds[5]), None)]
+    windows += [tuple(sorted(pair)) for pair in rng.choice(bounds, (40, 2)).tolist()]
+    for start, end in windows:
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times < end
+        arrays = store.read('USDJPY', start, end)
+        np.testing.assert_array_equal(arrays[TIME_COLUMN], times[mask])
+        np.testing.assert_array_equal(arrays['Bid'], prices[mask])
+
+
+def test_parameter_sweep(ticks, dense_runs):
+    from bar_samplers import DollarBarSampler, TickBarSampler, VolumeBarSampler
+    from intra_bar_zigzag import IntraBarZigzag
+    from parameter_sweep import run_sweep
+
+    samplers = [dense_runs[freq].bar_sampler for freq in FREQUENCIES]
+    samplers += [TickBarSampler(50), VolumeBarSampler(3.0), DollarBarSampler(420.0)]
+    table = run_sweep(ticks, samplers, max_workers=2)
+    for sampler, row in zip(samplers, table.to_dict('records')):
+        zigzag = next((run for run in dense_runs.values() if run.bar_sampler is sampler), None)
+        if zigzag is None:
+            zigzag = IntraBarZigzag(ticks, bar_sampler=sampler)
+            zigzag.runSetup()
+            zigzag.runDetection()
+        counts = zigzag.resampled_df['candle_type'].value_counts()
+        assert row['sampler'] == repr(sampler)
+        assert row['n_bars'] == len(zigzag.resampled_df)
+        assert row['n_swings'] == len(zigzag.swings)
+        assert {name: row[f'candles_{name}'] for name in counts.index} == counts.to_dict()
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+@pytest.mark.parametrize('sparse', [False, True])
+def test_core(ticks, dense_runs, freq, sparse):
+    from candle_classification import BLANK
+    from tick_loader import TIME_COLUMN
+    from zigzag_core import run_zigzag, tick_arrays
+
+    times, prices = tick_columns(ticks)
+    formatted = ticks.rename(columns={TIME_COLUMN: 'time', 'Bid': 'price'}).set_index('time')
+    order = np.argsort(times, kind='stable')
+    for table in (ticks, formatted, {TIME_COLUMN: times, 'Bid': prices}):
+        table_times, table_prices = tick_arrays(table)
+        np.testing.assert_array_equal(table_times, times[order])
+        np.testing.assert_array_equal(table_prices, prices[order])
+
+    result = run_zigzag(ticks, resample_frequency=freq, sparse=sparse)
+    dense = dense_runs[freq]
+    codes, bars = bar_arrays(dense.resampled_df)
+    # A sparse run only lacks the blank bars
+    keep = codes != BLANK if sparse else np.ones(len(codes), dtype=bool)
+    np.testing.assert_array_equal(result['labels'], dense.resampled_df.index.values.view(np.int64)[keep])
+    np.testing.assert_array_equal(result['bars']['candle_type'], codes[keep])
+    for col, values in bars.items():
+        np.testing.assert_array_equal(result['bars'][col], values[keep])
+    assert result['bars_removed'] == dense.metrics['bars_removed']
+    if sparse:
+        assert int(result['gaps']['length'][~result['gaps']['weekend']].sum()) == (~keep).sum()
+    assert_same_swings(result['swings'].times, result['swings'].prices, result['swings'].types, dense)
+
+
+@pytest.mark.parametrize('freq', FREQUENCIES)
+@pytest.mark.parametrize('source', ['arrays', 'csv'])
+def test_chunked(ticks, dense_runs, freq, source, tmp_path):
+    from chunked_pipeline import read_bars_frame, read_swings, run_chunked
+    from tick_loader import TIME_COLUMN, TIME_FORMAT
+
+    if source == 'csv':
+        path = tmp_path / 'ticks.csv'
+        ticks.assign(**{TIME_COLUMN: ticks[TIME_COLUMN].dt.strftime(TIME_FORMAT)}).to_csv(path, index=False)
+        source = str(path)
+    else:
+        times, prices = tick_columns(ticks)
+        source = {TIME_COLUMN: times, 'Bid': prices}
+    # An odd chunk size: chunks end inside bars, and several between ticks sharing a timestamp
+    meta = run_chunked(source, freq, str(tmp_path / 'out'), chunk_size=997)
+    assert meta['complete'] and meta['n_ticks'] == len(ticks)
+
+    pd.testing.assert_frame_equal(read_bars_frame(str(tmp_path / 'out')),
+                                  dense_runs[freq].resampled_df.drop(columns='nat_group'))
+    swings = read_swings(str(tmp_path / 'out'))
+    assert_same_swings(swings.times, swings.prices, swings.types, dense_runs[freq])
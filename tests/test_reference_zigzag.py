@@ -0,0 +1,26 @@
+"""Matching of candidate swings to reference swings."""
+import numpy as np
+
+from reference_zigzag import HIGH, score_swings
+from swing_series import SwingSeries
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def highs(*seconds) -> SwingSeries:
+    times = np.array(seconds, dtype=np.int64) * NS_PER_SECOND
+    return SwingSeries(times, np.full(len(times), 140.0), np.full(len(times), HIGH, dtype=np.int8))
+
+
+def test_competing_references_fall_back_to_a_free_candidate():
+    # Both references are nearest to the candidate at 10s; the one at 12s takes it and the other gets 50s
+    score = score_swings(highs(0, 12), highs(10, 50), time_tolerance='1min')
+    assert score['matched'] == 2
+    assert score['precision'] == score['recall'] == 1.0
+    assert score['timing_error_abs_max'] == 50.0
+
+
+def test_pairs_outside_tolerance_stay_unmatched():
+    score = score_swings(highs(0, 12), highs(10, 50), time_tolerance='20s')
+    assert score['matched'] == 1
+    assert score['timing_error_abs_max'] == 2.0
@@ -0,0 +1,34 @@
+"""Swing legs against hand-built swings and a per-leg tick mask."""
+import numpy as np
+import pytest
+
+from swing_analytics import swing_legs
+from swing_detection import HIGH, LOW
+from swing_series import SwingSeries
+
+NS_PER_SECOND = 1_000_000_000
+
+
+def test_hand_built_legs():
+    # A low and a high share the 20s timestamp, so the middle leg has no duration
+    swings = SwingSeries(np.array([10, 20, 20, 40]) * NS_PER_SECOND, np.array([141.0, 140.0, 140.5, 140.2]),
+                         np.array([HIGH, LOW, HIGH, LOW], dtype=np.int8))
+    tick_times = np.array([5, 10, 10, 15, 20, 20, 25, 30, 40, 45]) * NS_PER_SECOND
+    legs = swing_legs(swings, tick_times)
+    assert legs['direction'].tolist() == ['down', 'up', 'down']
+    np.testing.assert_allclose(legs['amplitude'], [1.0, 0.5, 0.3])
+    np.testing.assert_allclose(legs['retracement'], [np.nan, 0.5, 0.6])
+    assert legs['duration'].dt.total_seconds().tolist() == [10.0, 0.0, 20.0]
+    # Both ends included, with every tick sharing an end's timestamp
+    assert legs['n_ticks'].tolist() == [5, 2, 5]
+
+
+@pytest.mark.parametrize('freq', [1, 60])
+def test_leg_ticks_against_a_mask(ticks, dense_runs, freq):
+    swings = dense_runs[freq].swings
+    tick_times = ticks['Time (EET)'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    legs = swing_legs(swings, ticks['Time (EET)'].to_numpy())
+    for i in np.random.default_rng(freq).choice(len(legs), 50):
+        in_leg = (tick_times >= swings.times[i]) & (tick_times <= swings.times[i + 1])
+        assert legs['n_ticks'].iloc[i] == in_leg.sum()
+        assert legs['amplitude'].iloc[i] == abs(swings.prices[i + 1] - swings.prices[i])
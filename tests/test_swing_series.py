@@ -0,0 +1,31 @@
+"""SwingSeries conversions."""
+import numpy as np
+import pytest
+
+from swing_detection import SWING_TYPES
+
+
+def test_arrow_round_trip(dense_runs):
+    pa = pytest.importorskip('pyarrow')
+
+    swings = dense_runs[1].swings
+    batch = swings.to_arrow()
+    assert batch.schema.names == ['time', 'price', 'type']
+    assert batch.schema.field('time').type == pa.timestamp('ns')
+    np.testing.assert_array_equal(batch.column(0).to_numpy().view(np.int64), swings.times)
+    np.testing.assert_array_equal(batch.column(1).to_numpy(), swings.prices)
+    np.testing.assert_array_equal(batch.column(2).indices.to_numpy(), swings.types)
+    assert batch.column(2).dictionary.to_pylist() == list(SWING_TYPES)
+    # Prices are shared, not copied
+    assert batch.column(1).buffers()[1].address == swings.prices.ctypes.data
+
+
+def test_arrow_to_pandas_matches_to_pandas(dense_runs):
+    pytest.importorskip('pyarrow')
+
+    swings = dense_runs[5].swings
+    df = swings.to_arrow().to_pandas()
+    expected = swings.to_pandas()
+    np.testing.assert_array_equal(df['time'].to_numpy(dtype='datetime64[ns]'), expected['time'].to_numpy())
+    np.testing.assert_array_equal(df['price'].to_numpy(), expected['price'].to_numpy())
+    assert df['type'].astype(str).tolist() == expected['type'].astype(str).tolist()